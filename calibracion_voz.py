@@ -0,0 +1,88 @@
+"""
+Calibración de ruido ambiente compartida para speech_recognition
+El energy_threshold se mide una vez con adjust_for_ambient_noise y se guarda en un
+JSON que comparten los procesos; las peticiones normales lo reutilizan sin pausa.
+Tras cada grabación el umbral (ajustado por dynamic_energy_threshold con los
+frames sin voz) se mezcla en segundo plano con el valor guardado.
+"""
+
+import json
+import os
+import threading
+import time
+
+import config
+
+
+class CalibracionRuido:
+    def __init__(self, ruta, vigencia, peso=0.2):
+        self.ruta = ruta
+        self.vigencia = vigencia
+        self.peso = peso  # cuánto cuenta cada grabación nueva en la media móvil
+        self._lock = threading.Lock()
+        self._datos = None
+
+    def _cargar(self):
+        try:
+            with open(self.ruta, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _guardar(self, datos):
+        temporal = f"{self.ruta}.{os.getpid()}.tmp"
+        try:
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(datos, f)
+            os.replace(temporal, self.ruta)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar la calibración de ruido: {e}")
+
+    def umbral(self):
+        """energy_threshold guardado si está vigente, si no None"""
+        with self._lock:
+            # Otro proceso pudo haber actualizado el archivo
+            self._datos = self._cargar() or self._datos
+            if not self._datos or time.time() - self._datos["actualizado"] > self.vigencia:
+                return None
+            return self._datos["energy_threshold"]
+
+    def fijar(self, umbral):
+        """Resultado de una calibración completa"""
+        with self._lock:
+            self._datos = {"energy_threshold": float(umbral), "actualizado": time.time()}
+            self._guardar(self._datos)
+
+    def mezclar(self, umbral):
+        """Actualización incremental con el umbral observado en una grabación"""
+        with self._lock:
+            anterior = (self._cargar() or self._datos or {}).get("energy_threshold")
+            nuevo = float(umbral) if anterior is None else (1 - self.peso) * anterior + self.peso * float(umbral)
+            self._datos = {"energy_threshold": nuevo, "actualizado": time.time()}
+            self._guardar(self._datos)
+
+
+calibracion = CalibracionRuido(config.CALIBRACION_VOZ_ARCHIVO, config.CALIBRACION_VOZ_VIGENCIA)
+
+
+def preparar(recognizer, source, duracion=1):
+    """Aplica la calibración guardada; solo escucha el ruido ambiente si falta o venció"""
+    recognizer.dynamic_energy_threshold = True
+    umbral = calibracion.umbral()
+    if umbral is not None:
+        recognizer.energy_threshold = umbral
+        return
+
+    print("🔧 Calibrando ruido ambiente...")
+    recognizer.adjust_for_ambient_noise(source, duration=duracion)
+    calibracion.fijar(recognizer.energy_threshold)
+
+
+def actualizar(recognizer):
+    """Tras escuchar: guarda el umbral ajustado sin retrasar la respuesta"""
+    threading.Thread(
+        target=calibracion.mezclar,
+        args=(recognizer.energy_threshold,),
+        name="calibracion-voz",
+        daemon=True
+    ).start()
@@ -0,0 +1,98 @@
+"""
+Certificado HTTPS autofirmado persistente
+El navegador solo da acceso a cámara y micrófono en HTTPS (o localhost). En lugar
+del certificado 'adhoc' que Flask genera en cada arranque, se crea uno una vez en
+certs/ y se reutiliza, así el teléfono solo tiene que aceptarlo la primera vez.
+"""
+
+import datetime
+import ipaddress
+import os
+import socket
+
+VIGENCIA_DIAS = 825
+
+
+def _vigente(ruta_cert):
+    from cryptography import x509
+
+    try:
+        with open(ruta_cert, "rb") as f:
+            cert = x509.load_pem_x509_certificate(f.read())
+    except (OSError, ValueError):
+        return False
+    return cert.not_valid_after > datetime.datetime.utcnow() + datetime.timedelta(days=1)
+
+
+def _nombres():
+    """localhost, el nombre del equipo y su IP en la red local"""
+    from cryptography import x509
+
+    nombres = [x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]
+    equipo = socket.gethostname()
+    if equipo and equipo != "localhost":
+        nombres.append(x509.DNSName(equipo))
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            # No envía nada: solo elige la interfaz de salida
+            s.connect(("10.255.255.255", 1))
+            ip = s.getsockname()[0]
+        if ip != "127.0.0.1":
+            nombres.append(x509.IPAddress(ipaddress.ip_address(ip)))
+    except OSError:
+        pass
+    return nombres
+
+
+def generar(ruta_cert, ruta_clave):
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+
+    clave = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    nombre = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "Look-y")])
+    ahora = datetime.datetime.utcnow()
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(nombre)
+        .issuer_name(nombre)
+        .public_key(clave.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(ahora - datetime.timedelta(minutes=5))
+        .not_valid_after(ahora + datetime.timedelta(days=VIGENCIA_DIAS))
+        .add_extension(x509.SubjectAlternativeName(_nombres()), critical=False)
+        .sign(clave, hashes.SHA256())
+    )
+
+    os.makedirs(os.path.dirname(ruta_cert) or ".", exist_ok=True)
+    os.makedirs(os.path.dirname(ruta_clave) or ".", exist_ok=True)
+    descriptor = os.open(ruta_clave, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(descriptor, "wb") as f:
+        f.write(clave.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption()
+        ))
+    with open(ruta_cert, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+
+
+def asegurar(ruta_cert, ruta_clave):
+    """(cert, clave) listos para usar, generándolos si faltan o vencieron; None sin cryptography"""
+    try:
+        import cryptography  # noqa: F401
+    except ImportError:
+        print("⚠️ Para HTTPS instala: pip install cryptography")
+        return None
+
+    if os.path.exists(ruta_clave) and _vigente(ruta_cert):
+        return ruta_cert, ruta_clave
+
+    try:
+        generar(ruta_cert, ruta_clave)
+    except Exception as e:
+        print(f"❌ No se pudo generar el certificado HTTPS: {e}")
+        return None
+    print(f"🔒 Certificado autofirmado creado en {ruta_cert}")
+    return ruta_cert, ruta_clave
@@ -0,0 +1,153 @@
+"""
+Configuración del servidor Look-y
+Todos los valores se pueden sobreescribir con variables de entorno
+"""
+
+import os
+
+
+def _entero(nombre, defecto):
+    try:
+        return int(os.environ.get(nombre, defecto))
+    except ValueError:
+        return defecto
+
+
+def _booleano(nombre, defecto):
+    valor = os.environ.get(nombre)
+    if valor is None:
+        return defecto
+    return valor.strip().lower() in ("1", "true", "si", "sí", "yes", "on")
+
+
+def _decimal(nombre, defecto):
+    try:
+        return float(os.environ.get(nombre, defecto))
+    except ValueError:
+        return defecto
+
+
+# ===============================
+#   Arranque
+# ===============================
+# Cargar modelos y workers en un hilo de fondo al iniciar (si no, en la primera petición)
+CALENTAR_AL_INICIO = _booleano("LOOKY_CALENTAR", True)
+
+# ===============================
+#   Servidor HTTP
+# ===============================
+HOST = os.environ.get("LOOKY_HOST", "0.0.0.0")
+PUERTO = _entero("LOOKY_PUERTO", 5000)
+# Modo desarrollo (python servidor_web_python.py): debugger y reloader de Flask
+DEBUG = _booleano("LOOKY_DEBUG", True)
+RECARGAR = _booleano("LOOKY_RECARGAR", DEBUG)
+# Producción (gunicorn -c gunicorn.conf.py wsgi:app): procesos y hilos por proceso.
+# Las sesiones de señas y los trabajos viven en cada worker, con más de uno
+# el cliente debe llegar siempre al mismo (proxy con afinidad por cookie/IP)
+SERVIDOR_WORKERS = max(1, _entero("LOOKY_WORKERS", 1))
+# Cada WebSocket o stream SSE ocupa un hilo mientras está abierto
+SERVIDOR_HILOS = max(1, _entero("LOOKY_HILOS", 32))
+# Cargar el modelo estático de señas en el proceso maestro antes del fork
+# (los workers lo comparten por copy-on-write)
+PRECARGAR_MODELOS = _booleano("LOOKY_PRECARGAR_MODELOS", True)
+# HTTPS con certificado autofirmado persistente (se genera una sola vez)
+HTTPS = _booleano("LOOKY_HTTPS", True)
+CERT_ARCHIVO = os.environ.get("LOOKY_CERT", os.path.join("certs", "look-y.crt"))
+CLAVE_ARCHIVO = os.environ.get("LOOKY_CLAVE", os.path.join("certs", "look-y.key"))
+
+# ===============================
+#   Pool de workers de voz
+# ===============================
+# Procesos persistentes que mantienen cargados speech_recognition,
+# googletrans y pyttsx3 entre peticiones
+WORKERS_VOZ = max(1, _entero("LOOKY_WORKERS_VOZ", 2))
+TIMEOUT_VOZ = _decimal("LOOKY_TIMEOUT_VOZ", 30)
+
+# ===============================
+#   Trabajos asíncronos (/trabajos)
+# ===============================
+TRABAJOS_HILOS = max(1, _entero("LOOKY_TRABAJOS_HILOS", 4))
+# Trabajos pendientes o en ejecución antes de responder 429
+TRABAJOS_CAPACIDAD = max(1, _entero("LOOKY_TRABAJOS_CAPACIDAD", 32))
+# Segundos que se conserva el resultado de un trabajo terminado
+TRABAJOS_RETENCION = _decimal("LOOKY_TRABAJOS_RETENCION", 300)
+
+# ===============================
+#   Dictado desde el navegador
+# ===============================
+# Reconocedor: google | local (sin red, para pruebas)
+RECONOCEDOR_VOZ = os.environ.get("LOOKY_RECONOCEDOR_VOZ", "google")
+HILOS_RECONOCIMIENTO = max(1, _entero("LOOKY_HILOS_RECONOCIMIENTO", 4))
+
+# ===============================
+#   Micrófono del servidor
+# ===============================
+# Calibración de ruido compartida; se repite solo cuando tiene más de VIGENCIA segundos
+CALIBRACION_VOZ_ARCHIVO = os.environ.get("LOOKY_CALIBRACION_VOZ", "calibracion_voz.json")
+CALIBRACION_VOZ_VIGENCIA = _decimal("LOOKY_CALIBRACION_VOZ_VIGENCIA", 6 * 3600)
+
+# ===============================
+#   Audio sintetizado
+# ===============================
+# Clips WAV generados por el TTS, reproducidos en el navegador
+AUDIO_DIR = os.environ.get("LOOKY_AUDIO_DIR", "cache_audio")
+AUDIO_MAX_MB = max(1, _entero("LOOKY_AUDIO_MAX_MB", 256))
+# Motores pyttsx3, cada uno en su hilo, para sintetizar en paralelo
+MOTORES_TTS = max(1, _entero("LOOKY_MOTORES_TTS", 2))
+
+# ===============================
+#   Traducción
+# ===============================
+# Proveedor: google | local (diccionario sin red)
+TRADUCCION_PROVEEDOR = os.environ.get("LOOKY_TRADUCCION_PROVEEDOR", "google")
+TRADUCCION_MAX_EN_VUELO = max(1, _entero("LOOKY_TRADUCCION_MAX_EN_VUELO", 4))
+TRADUCCION_TIMEOUT = _decimal("LOOKY_TRADUCCION_TIMEOUT", 5)
+TRADUCCION_REINTENTOS = max(0, _entero("LOOKY_TRADUCCION_REINTENTOS", 1))
+
+CACHE_TRADUCCION_CAPACIDAD = max(1, _entero("LOOKY_CACHE_TRADUCCION_CAPACIDAD", 1024))
+CACHE_TRADUCCION_TTL = _decimal("LOOKY_CACHE_TRADUCCION_TTL", 7 * 24 * 3600)
+# Archivo SQLite compartido por los workers; vacío = solo memoria
+CACHE_TRADUCCION_DB = os.environ.get("LOOKY_CACHE_TRADUCCION_DB", "cache_traducciones.db")
+
+# ===============================
+#   Carro (MQTT)
+# ===============================
+# Broker al que se conecta el ESP32 (esp32_mqtt_bridge.ino); vacío = cliente local sin red
+MQTT_BROKER = os.environ.get("LOOKY_MQTT_BROKER", "")
+MQTT_PUERTO = _entero("LOOKY_MQTT_PUERTO", 1883)
+# Separación mínima entre comandos de control; los intermedios se fusionan
+MQTT_INTERVALO_CONTROL = _decimal("LOOKY_MQTT_INTERVALO_CONTROL", 0.05)
+# Canal /ws/carro: comandos con más retraso que el plazo se descartan;
+# sin mensajes del cliente durante LATIDO_PERDIDO segundos el carro se detiene
+CARRO_PLAZO_MS = _decimal("LOOKY_CARRO_PLAZO_MS", 300)
+CARRO_LATIDO = _decimal("LOOKY_CARRO_LATIDO", 0.5)
+CARRO_LATIDO_PERDIDO = _decimal("LOOKY_CARRO_LATIDO_PERDIDO", 1.5)
+
+# ===============================
+#   Lenguaje de señas
+# ===============================
+SENAS_HABILITADO = _booleano("LOOKY_SENAS", True)
+# Cada sesión tiene su propio tracker de MediaPipe; los modelos se comparten
+SENAS_MAX_SESIONES = max(1, _entero("LOOKY_SENAS_MAX_SESIONES", 8))
+SENAS_SESION_IDLE = _decimal("LOOKY_SENAS_SESION_IDLE", 300)
+# Con el pool lleno no se desaloja una sesión con frames en los últimos N segundos:
+# la sesión nueva recibe 503 y reintenta
+SENAS_SESION_ACTIVA = _decimal("LOOKY_SENAS_SESION_ACTIVA", 10)
+# Frames en proceso a la vez antes de pedir al cliente que capture más lento
+SENAS_HILOS_DECODE = max(1, _entero("LOOKY_SENAS_HILOS_DECODE", os.cpu_count() or 4))
+# Predecir el modelo dinámico cada N frames (1 = en cada frame, más latencia con N > 1)
+SENAS_STRIDE_DINAMICO = max(1, _entero("LOOKY_SENAS_STRIDE_DINAMICO", 1))
+# Backend del modelo dinámico: keras | tflite | onnx (ver modelo_dinamico.py)
+SENAS_BACKEND_DINAMICO = os.environ.get("LOOKY_SENAS_BACKEND_DINAMICO", "keras")
+# Detección de la mano: recorte alrededor de la última posición reducido a ROI px
+# (0 = sin recorte) y búsqueda en el frame completo reducido a BUSQUEDA px (0 = tamaño original)
+SENAS_ROI = max(0, _entero("LOOKY_SENAS_ROI", 256))
+SENAS_ROI_MARGEN = _decimal("LOOKY_SENAS_ROI_MARGEN", 0.5)
+SENAS_BUSQUEDA = max(0, _entero("LOOKY_SENAS_BUSQUEDA", 320))
+# Micro-lotes de inferencia entre sesiones: tamaño máximo y espera máxima para
+# juntar el lote (1 = sin scheduler, cada sesión llama al modelo por su cuenta)
+SENAS_LOTE_MAX = max(1, _entero("LOOKY_SENAS_LOTE_MAX", 16))
+SENAS_LOTE_ESPERA_MS = max(0.0, _decimal("LOOKY_SENAS_LOTE_ESPERA_MS", 5))
+# Modo estático: reutilizar la última predicción mientras ningún landmark normalizado
+# se mueva más que esto desde el último frame clasificado (0 = clasificar siempre)
+SENAS_EPSILON_ESTATICO = max(0.0, _decimal("LOOKY_SENAS_EPSILON_ESTATICO", 0.02))
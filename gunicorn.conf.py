@@ -0,0 +1,41 @@
+"""
+Configuración de gunicorn para Look-y
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Workers, hilos, puerto y certificado salen de config.py (variables LOOKY_*).
+"""
+
+import config as ajustes  # "config" es el nombre de un ajuste de gunicorn
+import certificados
+
+bind = f"{ajustes.HOST}:{ajustes.PUERTO}"
+workers = ajustes.SERVIDOR_WORKERS
+# gthread: las rutas WebSocket (flask-sock) y SSE mantienen un hilo por conexión
+worker_class = "gthread"
+threads = ajustes.SERVIDOR_HILOS
+preload_app = True
+
+# Con gthread el timeout vigila al worker, no a cada petición; los streams largos no lo disparan
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+if ajustes.HTTPS:
+    certificado = certificados.asegurar(ajustes.CERT_ARCHIVO, ajustes.CLAVE_ARCHIVO)
+    if certificado:
+        certfile, keyfile = certificado
+
+
+def when_ready(server):
+    esquema = "https" if ajustes.HTTPS and "certfile" in globals() else "http"
+    server.log.info(f"🚀 Look-y en {esquema}://{bind} ({workers} workers × {threads} hilos)")
+
+
+def post_fork(server, worker):
+    # Ya dentro del worker: aquí sí se pueden arrancar hilos y procesos
+    # (calentamiento, motores TTS, pool de voz, MQTT al primer uso)
+    from servidor_web_python import iniciar_calentamiento
+    iniciar_calentamiento()
@@ -4,6 +4,7 @@ Modo ESTÁTICO + DINÁMICO con alta estabilidad
 """
 
 import cv2
+import math
 import mediapipe as mp
 import numpy as np
 import pickle
@@ -13,32 +14,398 @@ import sys
 import warnings
 import time
 
-from collections import deque, Counter
+import queue
+import struct
+import threading
+import uuid
+
+from collections import deque, OrderedDict
+from concurrent.futures import Future
 
 warnings.filterwarnings('ignore')
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 
 
-class SignLanguageRecognizer:
+def decode_frame(data):
+    """Decodifica un JPEG/PNG crudo (bytes) a un frame BGR sin copiar el buffer de entrada"""
+    img_array = np.frombuffer(data, dtype=np.uint8)
+    frame = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError("Frame inválido: no se pudo decodificar la imagen")
+    return frame
+
+
+# Paquete binario de landmarks (little-endian), para clientes que corren MediaPipe Hands:
+#   float64 timestamp en ms desde epoch (Date.now() del cliente) + uint8 número de manos
+#   + por mano 21 × (x, y, z) float32, en las mismas coordenadas normalizadas de MediaPipe
+LANDMARKS_HEADER = struct.Struct("<dB")
+HAND_BYTES = 21 * 3 * 4
+
+
+def decode_landmarks(data):
+    """Paquete binario → (timestamp_ms, array (manos, 21, 3) float32); lanza ValueError si no es válido"""
+    if len(data) < LANDMARKS_HEADER.size:
+        raise ValueError("Paquete de landmarks incompleto")
+    timestamp, hands = LANDMARKS_HEADER.unpack_from(data)
+    # Un inf dejaría todos los paquetes siguientes como viejos; NaN rompe las comparaciones de tiempo
+    if not math.isfinite(timestamp):
+        raise ValueError("Timestamp de landmarks no finito")
+    if len(data) != LANDMARKS_HEADER.size + hands * HAND_BYTES:
+        raise ValueError(f"Paquete de landmarks inválido: se esperaban {hands} manos de 21×3 float32")
+
+    landmarks = np.frombuffer(data, dtype="<f4", offset=LANDMARKS_HEADER.size).reshape(hands, 21, 3)
+    if not np.isfinite(landmarks).all():
+        raise ValueError("Landmarks con valores no finitos")
+    return timestamp, landmarks
+
+
+class RunningMean:
+    """Media de las últimas n muestras en O(1) con suma acumulada"""
+
+    def __init__(self, size):
+        self._values = deque(maxlen=size)
+        self._sum = 0.0
+
+    def append(self, value):
+        if len(self._values) == self._values.maxlen:
+            self._sum -= self._values[0]
+        self._values.append(value)
+        self._sum += value
+
+    def mean(self):
+        return self._sum / len(self._values) if self._values else 0.0
+
+    def clear(self):
+        self._values.clear()
+        self._sum = 0.0
+
+    def __len__(self):
+        return len(self._values)
+
+
+class VoteWindow:
+    """Votos de las últimas n predicciones con su histograma por clase.
+
+    append y el desalojo del más viejo actualizan el conteo en O(1); el líder
+    solo se recalcula (sobre a lo sumo n clases) cuando pierde un voto. En un
+    empate se mantiene el líder anterior, así la letra no cambia por un voto.
+    """
+
+    def __init__(self, size):
+        self._votes = deque(maxlen=size)
+        self._counts = {}
+        self._leader = None
+
+    def append(self, label):
+        if len(self._votes) == self._votes.maxlen:
+            self._evict(self._votes[0])
+        self._votes.append(label)
+
+        count = self._counts.get(label, 0) + 1
+        self._counts[label] = count
+        if self._leader is None or count > self._counts[self._leader]:
+            self._leader = label
+
+    def _evict(self, label):
+        count = self._counts[label] - 1
+        if count:
+            self._counts[label] = count
+        else:
+            del self._counts[label]
+
+        if label == self._leader:
+            best = max(self._counts.values(), default=0)
+            if count < best:
+                self._leader = next(l for l, c in self._counts.items() if c == best)
+            elif not count:
+                self._leader = None
+
+    def leader(self):
+        """Clase con más votos en la ventana"""
+        return self._leader
+
+    def clear(self):
+        self._votes.clear()
+        self._counts.clear()
+        self._leader = None
+
+    def __len__(self):
+        return len(self._votes)
+
+
+class SequenceWindow:
+    """Ventana circular (size, features) float32 para el modelo dinámico.
+
+    Cada fila se escribe dos veces (en i y en i + size), así la ventana en
+    orden cronológico siempre es una vista contigua del buffer y se le pasa
+    al modelo sin copiar ni reconstruir listas.
+    """
+
+    def __init__(self, size=30, features=126):
+        self.size = size
+        self._data = np.zeros((2 * size, features), dtype=np.float32)
+        self._index = 0  # próxima posición a escribir
+        self._count = 0
+
+    def append(self, row):
+        self._data[self._index] = row
+        self._data[self._index + self.size] = row
+        self._index = (self._index + 1) % self.size
+        if self._count < self.size:
+            self._count += 1
+
+    def is_full(self):
+        return self._count == self.size
+
+    def batch(self):
+        """Vista (1, size, features) de la más vieja a la más nueva"""
+        return self._data[self._index:self._index + self.size][np.newaxis]
+
+    def clear(self):
+        self._index = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+
+class FrameOrder:
+    """Números de secuencia de una sesión para procesar frames en orden"""
+
     def __init__(self):
-        print("🔧 Inicializando reconocedor optimizado...")
+        self._lock = threading.Lock()
+        self._next_seq = 0
+        self.latest_ready = -1  # secuencia más reciente ya decodificada
+        self.last_done = -1     # última secuencia procesada
 
-        # ===============================
-        #  Carga de modelos
-        # ===============================
+    def next_seq(self):
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            return seq
+
+    def mark_ready(self, seq):
+        with self._lock:
+            if seq >= self._next_seq:
+                self._next_seq = seq + 1
+            if seq > self.latest_ready:
+                self.latest_ready = seq
+
+    def mark_done(self, seq):
+        with self._lock:
+            self.last_done = seq
+
+    def is_stale(self, seq):
+        """Un frame es viejo si ya hay otro más nuevo decodificado o procesado"""
+        with self._lock:
+            return seq <= self.last_done or seq < self.latest_ready
+
+
+class StaticClassifier:
+    """Inferencia estática en una sola pasada.
+
+    Calcula predict_proba una vez y toma la etiqueta de classes_[argmax],
+    en lugar de correr el ensamble dos veces (predict + predict_proba).
+    Espera lotes float32 de forma (n, 42).
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.classes = model.classes_
+
+    def predict_batch(self, batch):
+        """Clasifica n vectores en una llamada; devuelve (etiquetas, confianzas)"""
+        proba = self.model.predict_proba(batch)
+        idx = proba.argmax(axis=1)
+        return self.classes[idx], proba[np.arange(len(idx)), idx]
+
+    def predict_one(self, row):
+        """Clasifica una fila (1, 42); devuelve (etiqueta, confianza)"""
+        proba = self.model.predict_proba(row)[0]
+        idx = proba.argmax()
+        return self.classes[idx], proba[idx]
+
+
+class InferenceScheduler:
+    """Micro-lotes de inferencia entre sesiones.
+
+    Cada sesión deja su fila estática (1, 42) o su ventana dinámica (1, 30, 126)
+    en una cola y espera el resultado. Un hilo por modelo junta lo pendiente de
+    todas las sesiones (hasta max_batch, esperando como mucho max_wait segundos
+    desde la primera) y hace una sola llamada predict_batch / predict.
+    Solo se espera si el lote anterior tuvo más de un elemento: con una sola
+    sesión activa no se agrega latencia.
+    """
+
+    KINDS = ("static", "dynamic")
+
+    def __init__(self, models, max_batch=16, max_wait=0.005):
+        self.models = models
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queues = {kind: queue.Queue() for kind in self.KINDS}
+        self._threads = {}
+        self._last_size = {kind: 1 for kind in self.KINDS}
+        self._lock = threading.Lock()
+        self._stats = {kind: {"batches": 0, "items": 0, "largest": 0} for kind in self.KINDS}
+
+    def predict_static(self, row):
+        """Fila (1, 42) → (etiqueta, confianza)"""
+        return self._submit("static", row)
+
+    def predict_dynamic(self, window):
+        """Ventana (1, 30, 126) → probabilidades de cada clase"""
+        return self._submit("dynamic", window)
+
+    def _submit(self, kind, data):
+        # El llamador bloquea hasta el resultado: su buffer no cambia mientras está en cola
+        future = Future()
+        self._start(kind)
+        self._queues[kind].put((data, future))
+        return future.result()
+
+    def _start(self, kind):
+        """Los hilos arrancan con la primera inferencia (no antes de un fork)"""
+        if kind in self._threads:
+            return
+        with self._lock:
+            if kind not in self._threads:
+                thread = threading.Thread(target=self._loop, args=(kind,), name=f"senas-lote-{kind}", daemon=True)
+                thread.start()
+                self._threads[kind] = thread
+
+    def _collect(self, kind, pending):
+        items = [pending.get()]
+        deadline = time.monotonic() + (self.max_wait if self._last_size[kind] > 1 else 0)
+        while len(items) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                # Pasado el plazo igual se toma todo lo que ya está en cola
+                items.append(pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run_static(self, rows):
+        labels, confidences = self.models.static_classifier.predict_batch(np.concatenate(rows))
+        return list(zip(labels, confidences))
+
+    def _run_dynamic(self, windows):
+        return list(self.models.dynamic_model.predict(np.concatenate(windows)))
+
+    def _loop(self, kind):
+        run = self._run_static if kind == "static" else self._run_dynamic
+        pending = self._queues[kind]
+        while True:
+            items = self._collect(kind, pending)
+            self._last_size[kind] = len(items)
+            try:
+                results = run([data for data, _ in items])
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(items, results):
+                future.set_result(result)
+
+            with self._lock:
+                stats = self._stats[kind]
+                stats["batches"] += 1
+                stats["items"] += len(items)
+                stats["largest"] = max(stats["largest"], len(items))
+
+    def metrics(self):
+        with self._lock:
+            return {
+                kind: {**stats, "mean_batch": round(stats["items"] / stats["batches"], 2) if stats["batches"] else 0}
+                for kind, stats in self._stats.items()
+            }
+
+
+class SignModels:
+    """Modelos pesados compartidos (solo lectura) entre todas las sesiones.
+
+    Con dynamic_backend=None solo se carga el modelo estático (sklearn), que se
+    puede cargar antes de un fork; el dinámico se agrega después con load_dynamic().
+    """
+
+    def __init__(self, dynamic_backend="keras"):
         self.static_model = None
+        self.static_classifier = None
         self.dynamic_model = None
         self.dynamic_classes = None
 
         self._load_static()
-        self._load_dynamic()
+        if dynamic_backend:
+            self.load_dynamic(dynamic_backend)
+
+        if self.static_model:
+            self.static_classifier = StaticClassifier(self.static_model)
+
+    def warmup(self):
+        """Inferencia de prueba para pagar la primera llamada (trazado/caches) antes del primer usuario"""
+        if self.static_classifier:
+            self.static_classifier.predict_one(np.zeros((1, 42), dtype=np.float32))
+        if self.dynamic_model:
+            self.dynamic_model.predict(np.zeros((1, 30, 126), dtype=np.float32))
 
         if not self.static_model and not self.dynamic_model:
             raise Exception("No se encontraron modelos")
 
+    # ====================================
+    #        CARGA MODELOS
+    # ====================================
+
+    def _load_static(self):
+        try:
+            file = "model.joblib" if os.path.exists("model.joblib") else "model.p"
+
+            if os.path.exists(file):
+                if file.endswith(".joblib"):
+                    data = joblib.load(file)
+                    self.static_model = data["model"]
+                else:
+                    with open(file, "rb") as f:
+                        data = pickle.load(f)
+                        self.static_model = data["model"]
+
+                print("✅ Modelo estático cargado")
+        except:
+            print("⚠️ No se pudo cargar modelo estático")
+
+    def load_dynamic(self, backend):
+        try:
+            from modelo_dinamico import load_dynamic_backend
+
+            if os.path.exists("sequence_model.h5") and os.path.exists("label_encoder.npy"):
+                self.dynamic_model = load_dynamic_backend(backend)
+                self.dynamic_classes = np.load("label_encoder.npy", allow_pickle=True)
+                print(f"✅ Modelo dinámico cargado ({self.dynamic_model.name})")
+        except:
+            print("⚠️ No se pudo cargar modelo dinámico")
+
+
+class SignLanguageRecognizer:
+    def __init__(self, models=None, dynamic_stride=1, roi_size=256, search_size=320, roi_margin=0.5,
+                 scheduler=None, static_epsilon=0.02):
+        print("🔧 Inicializando reconocedor optimizado...")
+
+        # ===============================
+        #  Modelos (compartidos si se reciben)
+        # ===============================
+        self.models = models if models is not None else SignModels()
+        self.static_model = self.models.static_model
+        self.static_classifier = self.models.static_classifier
+        self.dynamic_model = self.models.dynamic_model
+        self.dynamic_classes = self.models.dynamic_classes
+        # Si hay scheduler, las inferencias se agrupan con las de otras sesiones
+        self.scheduler = scheduler
+
         # ===============================
         #   Mediapipe — Más precisión
         # ===============================
+        # El tracker guarda estado entre frames: uno por sesión
         self.mp_hands = mp.solutions.hands
         self.hands = self.mp_hands.Hands(
             static_image_mode=False,
@@ -47,15 +414,48 @@ class SignLanguageRecognizer:
             min_tracking_confidence=0.75    # ↑ antes 0.5
         )
 
+        # ===============================
+        #   Región de interés
+        # ===============================
+        # Con mano en el frame anterior solo se busca en un recorte cuadrado alrededor
+        # de ella, reducido a ROI_SIZE px; sin mano, en el frame completo reducido a
+        # SEARCH_SIZE px. roi_size=0 desactiva el recorte.
+        self.ROI_SIZE = roi_size
+        self.SEARCH_SIZE = search_size
+        self.ROI_MARGIN = roi_margin  # margen por lado, en proporción al tamaño de la mano
+        self._roi = None  # (x0, y0, lado, ancho, alto) en píxeles del frame en que se calculó
+        self._roi_buffer = None
+        self._search_buffer = None
+        self.roi_hits = 0
+        self.full_searches = 0
+
         # ===============================
         # Variables internas
         # ===============================
-        self.previous_landmarks = None
-        self.motion_scores = deque(maxlen=15)
+        self._frame_rgb = None  # buffer reutilizable para la conversión BGR→RGB
+
+        # Landmarks: un solo (21,3) float32 por frame; el resto son vistas
+        self._landmarks = np.empty((21, 3), dtype=np.float32)
+        self._previous_landmarks = np.empty((21, 3), dtype=np.float32)
+        self._has_previous = False
+        self._last_timestamp = None  # último timestamp de cliente procesado (process_landmarks)
+        self._relative = np.empty((21, 3), dtype=np.float32)
+        self._motion_diff = np.empty((21, 3), dtype=np.float32)
+        self._dynamic_features = np.zeros(126, dtype=np.float32)  # 63 usados + padding en cero
+        self.motion_scores = RunningMean(15)
         self.MOTION_THRESHOLD = 0.045   # ↑ más robusto
 
         # Static mode
-        self.prediction_buffer = deque(maxlen=12)  # ↑ más estable
+        self._static_row = np.empty((1, 42), dtype=np.float32)  # entrada preasignada del clasificador
+        self.prediction_buffer = VoteWindow(12)  # ↑ más estable
+        # Pose quieta: si ningún feature se movió más de STATIC_EPSILON desde el último
+        # frame clasificado se reutiliza su predicción (0 = clasificar siempre)
+        self.STATIC_EPSILON = static_epsilon
+        self._classified_row = np.empty((1, 42), dtype=np.float32)
+        self._row_diff = np.empty((1, 42), dtype=np.float32)
+        self._cached_prediction = None  # (etiqueta, confianza) de _classified_row
+        self.static_inferences = 0
+        self.static_reused = 0
         self.last_letter = None
         self.letter_hold_start = 0
         self.HOLD_TIME = 0.50  # ↓ más rápido
@@ -64,7 +464,9 @@ class SignLanguageRecognizer:
         self.spelled_text = ""
 
         # Dynamic mode
-        self.sequence_buffer = deque(maxlen=30)
+        self.sequence_buffer = SequenceWindow(30, 126)
+        self.DYNAMIC_STRIDE = max(1, dynamic_stride)  # predecir cada N frames
+        self._frames_since_prediction = 0
         self.last_word = None
         self.last_word_time = 0
         self.WORD_COOLDOWN = 1.5  # ↑ evitar spam
@@ -73,70 +475,206 @@ class SignLanguageRecognizer:
         # Mode
         self.active_mode = "static"
 
+        # Ritmo de captura sugerido al cliente: (ms entre frames, ancho del frame)
+        self._frames_without_hand = 0
+        self.CAPTURE_IDLE = (500, 320)     # sin mano: solo buscarla
+        self.CAPTURE_STATIC = (200, 480)   # pose quieta: basta con ir llenando el voto
+        self.CAPTURE_MOVING = (100, 640)   # movimiento creciente: puede empezar una seña dinámica
+        self.CAPTURE_DYNAMIC = (66, 640)   # la ventana de 30 frames necesita frames densos
+        self.MAX_CAPTURE_INTERVAL = 1000
+
+        # Concurrencia: un solo frame a la vez por sesión y orden de llegada
+        self.lock = threading.RLock()
+        self.order = FrameOrder()
+        self.closed = False  # desalojada del pool: quien la tenga debe pedir la sesión de nuevo
+
         print("✅ Modelo listo")
 
     # ====================================
-    #        CARGA MODELOS
+    #        PROCESAR FRAME
     # ====================================
 
-    def _load_static(self):
-        try:
-            file = "model.joblib" if os.path.exists("model.joblib") else "model.p"
+    def _to_rgb(self, frame):
+        """Convierte a RGB escribiendo siempre en el mismo buffer mientras no cambie el tamaño"""
+        if self._frame_rgb is None or self._frame_rgb.shape != frame.shape:
+            self._frame_rgb = np.empty_like(frame)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._frame_rgb)
+        return self._frame_rgb
 
-            if os.path.exists(file):
-                if file.endswith(".joblib"):
-                    data = joblib.load(file)
-                    self.static_model = data["model"]
-                else:
-                    with open(file, "rb") as f:
-                        data = pickle.load(f)
-                        self.static_model = data["model"]
+    # ====================================
+    #        FEATURES DE LANDMARKS
+    # ====================================
 
-                print("✅ Modelo estático cargado")
-        except:
-            print("⚠️ No se pudo cargar modelo estático")
+    def _extract_landmarks(self, hand):
+        """Copia los 21 landmarks (x, y, z) al buffer (21,3) en una sola pasada"""
+        self._landmarks.reshape(-1)[:] = [c for lm in hand.landmark for c in (lm.x, lm.y, lm.z)]
+        np.subtract(self._landmarks, self._landmarks[0], out=self._relative)
 
-    def _load_dynamic(self):
-        try:
-            import tensorflow as tf
+    def _set_landmarks(self, hand):
+        """Igual que _extract_landmarks pero desde un array (21,3) ya calculado por el cliente"""
+        np.copyto(self._landmarks, hand)
+        np.subtract(self._landmarks, self._landmarks[0], out=self._relative)
 
-            if os.path.exists("sequence_model.h5") and os.path.exists("label_encoder.npy"):
-                self.dynamic_model = tf.keras.models.load_model("sequence_model.h5")
-                self.dynamic_classes = np.load("label_encoder.npy", allow_pickle=True)
-                print("✅ Modelo dinámico cargado")
-        except:
-            print("⚠️ No se pudo cargar modelo dinámico")
+    def _motion_score(self):
+        """Desplazamiento medio de los landmarks respecto al frame anterior"""
+        diff = np.subtract(self._landmarks, self._previous_landmarks, out=self._motion_diff)
+        return float(np.sqrt(np.einsum('ij,ij->i', diff, diff)).mean())
+
+    def _static_features(self):
+        """(x, y) relativos a la muñeca normalizados, escritos en la fila del clasificador (1, 42)"""
+        xy = self._relative[:, :2]
+        out = self._static_row.reshape(21, 2)
+        maxv = np.abs(xy).max()
+        if maxv != 0:
+            np.divide(xy, maxv, out=out)
+        else:
+            out[:] = xy
+        return self._static_row
+
+    def _fill_dynamic_features(self):
+        """(x, y, z) relativos normalizados en las primeras 63 posiciones del vector de 126"""
+        out = self._dynamic_features[:63].reshape(21, 3)
+        maxv = np.abs(self._relative).max()
+        if maxv != 0:
+            np.divide(self._relative, maxv, out=out)
+        else:
+            out[:] = self._relative
+        return self._dynamic_features
+
+    def process_frame(self, frame):
+        with self.lock:
+            return self.process_rgb(self._to_rgb(frame))
 
     # ====================================
-    #        PROCESAR FRAME
+    #        REGIÓN DE INTERÉS
     # ====================================
 
-    def process_frame(self, frame):
-        frameRGB = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(frameRGB)
+    def _downscale(self, image, size, buffer):
+        """Reduce la imagen para que su lado mayor mida `size` (no amplía); reutiliza el buffer"""
+        height, width = image.shape[:2]
+        scale = size / max(height, width)
+        if scale >= 1:
+            return np.ascontiguousarray(image), buffer
+        shape = (max(1, round(height * scale)), max(1, round(width * scale)), 3)
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=np.uint8)
+        cv2.resize(image, (shape[1], shape[0]), dst=buffer, interpolation=cv2.INTER_AREA)
+        return buffer, buffer
+
+    def _update_roi(self, width, height):
+        """Recorte cuadrado para el próximo frame a partir de la caja de los landmarks actuales"""
+        x = self._landmarks[:, 0] * width
+        y = self._landmarks[:, 1] * height
+        x_min, x_max, y_min, y_max = x.min(), x.max(), y.min(), y.max()
+        side = max(x_max - x_min, y_max - y_min) * (1 + 2 * self.ROI_MARGIN)
 
-        detected = results.multi_hand_landmarks is not None
+        # Si el recorte es casi todo el frame no ahorra nada
+        if side >= 0.8 * min(width, height):
+            self._roi = None
+            return
+
+        side = int(max(side, 64))
+        x0 = int(np.clip((x_min + x_max - side) / 2, 0, width - side))
+        y0 = int(np.clip((y_min + y_max - side) / 2, 0, height - side))
+        self._roi = (x0, y0, side, width, height)
+
+    def _detect_in_roi(self, frameRGB):
+        """Busca la mano en el recorte; si la encuentra deja los landmarks en coordenadas del frame completo"""
+        height, width = frameRGB.shape[:2]
+        x0, y0, side, roi_width, roi_height = self._roi
+        # El cliente cambió la resolución (capture_hint): el recorte ya no corresponde
+        if (width, height) != (roi_width, roi_height):
+            return False
+
+        crop, self._roi_buffer = self._downscale(
+            frameRGB[y0:y0 + side, x0:x0 + side], self.ROI_SIZE, self._roi_buffer
+        )
+        results = self.hands.process(crop)
+        if results.multi_hand_landmarks is None:
+            return False
+
+        # Normalizado al recorte → normalizado al frame completo (z escala con el ancho)
+        self._extract_landmarks(results.multi_hand_landmarks[0])
+        self._landmarks[:, 0] *= side / width
+        self._landmarks[:, 0] += x0 / width
+        self._landmarks[:, 1] *= side / height
+        self._landmarks[:, 1] += y0 / height
+        self._landmarks[:, 2] *= side / width
+        np.subtract(self._landmarks, self._landmarks[0], out=self._relative)
+        self.roi_hits += 1
+        return True
+
+    def _detect(self, frameRGB):
+        """Landmarks de la mano: primero en la región de interés, si se pierde en el frame completo"""
+        if self._roi is not None and self._detect_in_roi(frameRGB):
+            detected = True
+        else:
+            self.full_searches += 1
+            image = frameRGB
+            if self.SEARCH_SIZE:
+                image, self._search_buffer = self._downscale(frameRGB, self.SEARCH_SIZE, self._search_buffer)
+            results = self.hands.process(image)
+            detected = results.multi_hand_landmarks is not None
+            if detected:
+                self._extract_landmarks(results.multi_hand_landmarks[0])
+
+        if detected and self.ROI_SIZE:
+            self._update_roi(frameRGB.shape[1], frameRGB.shape[0])
+        else:
+            self._roi = None
+        return detected
+
+    def process_rgb(self, frameRGB):
+        """Procesa un frame ya en RGB. El llamador debe tener self.lock"""
+        detected = self._detect(frameRGB)
+        return self._process(detected, time.time())
+
+    def process_landmarks(self, landmarks, timestamp=None):
+        """Procesa landmarks ya detectados por el cliente, sin imagen ni MediaPipe.
+
+        landmarks: array (manos, 21, 3) o (21, 3); sin manos = mano no detectada.
+        timestamp: ms del reloj del cliente; marca el tiempo de HOLD_TIME y
+        WORD_COOLDOWN, y un paquete no más nuevo que el último se descarta.
+        """
+        landmarks = np.asarray(landmarks, dtype=np.float32).reshape(-1, 21, 3)
+
+        with self.lock:
+            if timestamp is not None:
+                if self._last_timestamp is not None and timestamp <= self._last_timestamp:
+                    result = self._result()
+                    result["dropped"] = True
+                    return result
+                self._last_timestamp = timestamp
+
+            detected = len(landmarks) > 0
+            if detected:
+                self._set_landmarks(landmarks[0])
+
+            now = timestamp / 1000.0 if timestamp is not None else time.time()
+            return self._process(detected, now)
+
+    def _process(self, detected, now):
+        """Movimiento, modo y clasificación a partir de los landmarks del frame actual"""
 
         # ====================================
         #      DETECCIÓN DE MOVIMIENTO
         # ====================================
         if detected:
-            hand = results.multi_hand_landmarks[0]
-            now_landmarks = np.array([[lm.x, lm.y, lm.z] for lm in hand.landmark])
-
-            if self.previous_landmarks is not None:
-                dist = np.mean(np.sqrt(np.sum((now_landmarks - self.previous_landmarks)**2, axis=1)))
-                self.motion_scores.append(dist)
+            self._frames_without_hand = 0
+            if self._has_previous:
+                self.motion_scores.append(self._motion_score())
 
-            self.previous_landmarks = now_landmarks
+            np.copyto(self._previous_landmarks, self._landmarks)
+            self._has_previous = True
         else:
+            self._frames_without_hand += 1
             self.motion_scores.clear()
 
         # ======================
         #   Elegir modo
         # ======================
         if len(self.motion_scores) >= 5:
-            avg = np.mean(self.motion_scores)
+            avg = self.motion_scores.mean()
 
             if avg > self.MOTION_THRESHOLD and self.dynamic_model:
                 if self.active_mode != "dynamic":
@@ -153,63 +691,42 @@ class SignLanguageRecognizer:
         confidence = 0
 
         if detected and self.active_mode == "static" and self.static_model:
-            hand = results.multi_hand_landmarks[0]
-
-            lm = np.array([[lm.x, lm.y] for lm in hand.landmark])
-            lm -= lm[0]
-            maxv = np.max(np.abs(lm))
-            if maxv != 0:
-                lm /= maxv
-            lm = lm.flatten()
-
-            if lm.shape == (42,):
-                pred = self.static_model.predict([lm])[0]
-                proba = self.static_model.predict_proba([lm])[0]
-                confidence = np.max(proba)
-
-                if confidence >= 0.50:  # ↑ antes 0.25
-                    self.prediction_buffer.append(pred)
-
-                # === smoothing ===
-                if len(self.prediction_buffer) >= 8:
-                    most = Counter(self.prediction_buffer).most_common(1)[0]
-                    letter = most[0]
-
-                    now = time.time()
-                    if letter == self.last_letter:
-                        if now - self.letter_hold_start >= self.HOLD_TIME:
-                            if not self.spelled_text.endswith(letter):
-                                self.spelled_text += letter
-                                self.last_letter = None
-                    else:
-                        self.last_letter = letter
-                        self.letter_hold_start = now
+            pred, confidence = self._classify_static(self._static_features())
+
+            if confidence >= 0.50:  # ↑ antes 0.25
+                self.prediction_buffer.append(pred)
+
+            # === smoothing ===
+            if len(self.prediction_buffer) >= 8:
+                letter = self.prediction_buffer.leader()
+
+                if letter == self.last_letter:
+                    if now - self.letter_hold_start >= self.HOLD_TIME:
+                        if not self.spelled_text.endswith(letter):
+                            self.spelled_text += letter
+                            self.last_letter = None
+                else:
+                    self.last_letter = letter
+                    self.letter_hold_start = now
 
         # ======================
         #   MODO DINÁMICO
         # ======================
         elif detected and self.active_mode == "dynamic" and self.dynamic_model:
 
-            # Extraer features del frame
-            hand = results.multi_hand_landmarks[0]
-            lm = np.array([[lm.x, lm.y, lm.z] for lm in hand.landmark])
-            lm -= lm[0]
-            maxv = np.max(np.abs(lm))
-            if maxv != 0:
-                lm /= maxv
-            lm = lm.flatten().tolist()
+            # Features del frame (126 con padding) copiadas al ring
+            self.sequence_buffer.append(self._fill_dynamic_features())
+            self._frames_since_prediction += 1
 
-            if len(lm) < 126:
-                lm += [0] * (126 - len(lm))
-
-            self.sequence_buffer.append(lm[:126])
-
-            # Solo predecir con ventana completa
-            if len(self.sequence_buffer) == 30:
-                now = time.time()
+            # Solo predecir con ventana completa y cada DYNAMIC_STRIDE frames
+            if self.sequence_buffer.is_full() and self._frames_since_prediction >= self.DYNAMIC_STRIDE:
                 if now - self.last_word_time > self.WORD_COOLDOWN:
-                    seq = np.array([list(self.sequence_buffer)])
-                    preds = self.dynamic_model.predict(seq, verbose=0)[0]
+                    self._frames_since_prediction = 0
+                    seq = self.sequence_buffer.batch()
+                    if self.scheduler is not None:
+                        preds = self.scheduler.predict_dynamic(seq)
+                    else:
+                        preds = self.dynamic_model.predict(seq)[0]
                     idx = np.argmax(preds)
                     confidence = preds[idx]
 
@@ -224,16 +741,353 @@ class SignLanguageRecognizer:
                         self.last_word = word
                         self.last_word_time = now
 
+        return self._result(confidence)
+
+    def _classify_static(self, row):
+        """Clasifica la fila, o reutiliza la última predicción si la pose casi no cambió"""
+        if self._cached_prediction is not None and self.STATIC_EPSILON > 0:
+            np.subtract(row, self._classified_row, out=self._row_diff)
+            np.abs(self._row_diff, out=self._row_diff)
+            if self._row_diff.max() < self.STATIC_EPSILON:
+                self.static_reused += 1
+                return self._cached_prediction
+
+        if self.scheduler is not None:
+            prediction = self.scheduler.predict_static(row)
+        else:
+            prediction = self.static_classifier.predict_one(row)
+
+        np.copyto(self._classified_row, row)
+        self._cached_prediction = prediction
+        self.static_inferences += 1
+        return prediction
+
+    def _result(self, confidence=0):
         return {
             "text": self.spelled_text,
             "mode": self.active_mode,
             "confidence": round(float(confidence) * 100, 2)
         }
 
+    def capture_hint(self, load=0.0):
+        """Intervalo y ancho sugeridos para el próximo frame.
+
+        load: frames en proceso por worker del pipeline; por encima de 1 el
+        servidor está saturado y el intervalo se estira en proporción.
+        """
+        if self._frames_without_hand >= 3:
+            interval, width = self.CAPTURE_IDLE
+        elif self.active_mode == "dynamic":
+            interval, width = self.CAPTURE_DYNAMIC
+        elif self.dynamic_model and self.motion_scores.mean() > self.MOTION_THRESHOLD / 2:
+            interval, width = self.CAPTURE_MOVING
+        else:
+            interval, width = self.CAPTURE_STATIC
+
+        if load > 1:
+            interval = min(self.MAX_CAPTURE_INTERVAL, interval * load)
+        return {"next_interval_ms": int(interval), "next_width": width}
+
+    # ======================
+    def get_text(self):
+        return self.spelled_text
+
+    def close(self):
+        """Libera el grafo de MediaPipe de esta sesión (espera a que termine el frame en curso)"""
+        with self.lock:
+            self.closed = True
+            self.hands.close()
+
     # ======================
     def reset(self):
-        self.spelled_text = ""
-        self.prediction_buffer.clear()
-        self.sequence_buffer.clear()
-        self.last_letter = None
-        self.last_word = None
+        with self.lock:
+            self.spelled_text = ""
+            self.prediction_buffer.clear()
+            self.sequence_buffer.clear()
+            self.last_letter = None
+            self.last_word = None
+            self._last_timestamp = None
+
+
+# ====================================
+#        POOL DE SESIONES
+# ====================================
+
+class SessionPoolFull(Exception):
+    """Todas las sesiones están en uso: la nueva debe reintentar más tarde"""
+
+
+class SignSessionPool:
+    """Un reconocedor por cliente, con modelos compartidos.
+
+    Las sesiones se desalojan por inactividad cuando superan idle_timeout
+    segundos sin frames. Con max_sessions alcanzado se desaloja la menos
+    reciente solo si lleva más de active_window segundos sin frames; si
+    todas están activas la sesión nueva se rechaza (SessionPoolFull).
+    """
+
+    def __init__(self, models, max_sessions=8, idle_timeout=300, recognizer_options=None, scheduler=None,
+                 active_window=10):
+        self.models = models
+        self.active_window = active_window
+        self.scheduler = scheduler
+        self.recognizer_options = {**(recognizer_options or {}), "scheduler": scheduler}
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+
+        self._sessions = OrderedDict()  # session_id -> (recognizer, último acceso)
+        self._lock = threading.Lock()
+
+        self.created = 0
+        self.evicted_lru = 0
+        self.evicted_idle = 0
+        self.rejected = 0
+
+    def warmup(self):
+        """Calienta los modelos y el grafo de MediaPipe con un frame vacío"""
+        self.models.warmup()
+        recognizer = SignLanguageRecognizer(self.models, **self.recognizer_options)
+        try:
+            with recognizer.lock:
+                recognizer.process_rgb(np.zeros((480, 640, 3), dtype=np.uint8))
+        finally:
+            recognizer.close()
+
+    @staticmethod
+    def new_session_id():
+        return uuid.uuid4().hex
+
+    def get(self, session_id):
+        """Devuelve el reconocedor de la sesión, creándolo si no existe.
+
+        Lanza SessionPoolFull si hay que crearla y no hay ninguna sesión inactiva para desalojar.
+        """
+        now = time.time()
+        evicted = []
+        pending = None
+
+        try:
+            with self._lock:
+                evicted += self._evict_idle(now)
+
+                entry = self._sessions.get(session_id)
+                if entry is not None:
+                    recognizer = entry[0]
+                    self._sessions.move_to_end(session_id)
+                else:
+                    while len(self._sessions) >= self.max_sessions:
+                        _, (old, last_seen) = next(iter(self._sessions.items()))
+                        if now - last_seen < self.active_window:
+                            self.rejected += 1
+                            raise SessionPoolFull(f"Las {self.max_sessions} sesiones de señas están en uso")
+                        self._sessions.popitem(last=False)
+                        evicted.append(old)
+                        self.evicted_lru += 1
+
+                    # Se reserva el lugar con un Future: el grafo de MediaPipe (cientos de ms)
+                    # se crea fuera del lock para no frenar a las demás sesiones
+                    recognizer = pending = Future()
+
+                self._sessions[session_id] = (recognizer, now)
+        finally:
+            # Cerrar los grafos de MediaPipe fuera del lock del pool; close() espera
+            # a que termine el frame que el reconocedor esté procesando
+            self._close(evicted)
+
+        if pending is not None:
+            return self._build(session_id, pending)
+        if isinstance(recognizer, Future):
+            return recognizer.result()  # otra petición de la misma sesión lo está creando
+        return recognizer
+
+    def _build(self, session_id, pending):
+        """Crea el reconocedor reservado en get() y lo publica en su sesión"""
+        try:
+            recognizer = SignLanguageRecognizer(self.models, **self.recognizer_options)
+        except Exception as e:
+            with self._lock:
+                entry = self._sessions.get(session_id)
+                if entry is not None and entry[0] is pending:
+                    del self._sessions[session_id]
+            pending.set_exception(e)
+            raise
+
+        with self._lock:
+            self.created += 1
+            entry = self._sessions.get(session_id)
+            published = entry is not None and entry[0] is pending
+            if published:
+                self._sessions[session_id] = (recognizer, entry[1])
+        if not published:
+            # La sesión se desalojó mientras se creaba: se entrega cerrado y
+            # FramePipeline vuelve a pedir la sesión
+            recognizer.close()
+        pending.set_result(recognizer)
+        return recognizer
+
+    @staticmethod
+    def _close(recognizers):
+        for recognizer in recognizers:
+            # Una reserva sin terminar la cierra _build al ver que ya no está publicada
+            if not isinstance(recognizer, Future):
+                recognizer.close()
+
+    def peek(self, session_id):
+        """Devuelve el reconocedor si existe, sin crearlo ni renovar su acceso"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+        if entry is None or isinstance(entry[0], Future):
+            return None
+        return entry[0]
+
+    def remove(self, session_id):
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            self._close([entry[0]])
+
+    def _evict_idle(self, now):
+        evicted = []
+        while self._sessions:
+            session_id, (recognizer, last_seen) = next(iter(self._sessions.items()))
+            if now - last_seen < self.idle_timeout:
+                break
+            del self._sessions[session_id]
+            evicted.append(recognizer)
+            self.evicted_idle += 1
+        return evicted
+
+    def metrics(self):
+        with self._lock:
+            evicted = self._evict_idle(time.time())
+            recognizers = [recognizer for recognizer, _ in self._sessions.values()
+                           if not isinstance(recognizer, Future)]
+            metrics = {
+                "roi_hits": sum(r.roi_hits for r in recognizers),
+                "full_searches": sum(r.full_searches for r in recognizers),
+                "static_inferences": sum(r.static_inferences for r in recognizers),
+                "static_reused": sum(r.static_reused for r in recognizers),
+                "active_sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "idle_timeout": self.idle_timeout,
+                "created": self.created,
+                "evicted_lru": self.evicted_lru,
+                "evicted_idle": self.evicted_idle,
+                "rejected": self.rejected,
+            }
+        if self.scheduler is not None:
+            metrics["inference"] = self.scheduler.metrics()
+
+        self._close(evicted)
+
+        return metrics
+
+
+# ====================================
+#        PIPELINE DE FRAMES
+# ====================================
+
+class FramePipeline:
+    """Decodifica frames en paralelo y los clasifica en orden por sesión.
+
+    La decodificación JPEG corre en el hilo de la petición, fuera de cualquier
+    lock (OpenCV libera el GIL), así los frames de varias peticiones se decodifican
+    en paralelo. La conversión a RGB (en el buffer reutilizable de la sesión), la
+    extracción de landmarks y la clasificación se hacen con el lock de la sesión;
+    si mientras tanto llegó un frame más nuevo de la misma sesión, el viejo se descarta.
+
+    workers: frames que el servidor procesa a la vez sin saturarse; mide la
+    carga para el ritmo de captura sugerido (capture_hint).
+    """
+
+    def __init__(self, sessions, workers=None):
+        self.sessions = sessions
+        self.workers = workers or os.cpu_count() or 4
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.processed = 0
+        self.dropped = 0
+
+    def submit(self, session_id, data, seq=None):
+        """Procesa un frame JPEG (bytes) de la sesión y devuelve el resultado"""
+        recognizer = self.sessions.get(session_id)
+        if seq is None:
+            seq = recognizer.order.next_seq()
+
+        with self._lock:
+            self.in_flight += 1
+        try:
+            frame = decode_frame(data)
+            recognizer.order.mark_ready(seq)
+
+            recognizer = self._lock_recognizer(session_id, recognizer, seq)
+            try:
+                if recognizer.order.is_stale(seq):
+                    with self._lock:
+                        self.dropped += 1
+                    result = recognizer._result()
+                    result["dropped"] = True
+                    return self._with_hint(recognizer, result)
+
+                # A RGB en el buffer de la sesión: cvtColor "in place" copia el frame por dentro
+                result = recognizer.process_rgb(recognizer._to_rgb(frame))
+                recognizer.order.mark_done(seq)
+            finally:
+                recognizer.lock.release()
+
+            with self._lock:
+                self.processed += 1
+            return self._with_hint(recognizer, result)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def submit_landmarks(self, session_id, data):
+        """Procesa un paquete binario de landmarks (ver decode_landmarks): sin decodificar imagen"""
+        timestamp, landmarks = decode_landmarks(data)
+        recognizer = self.sessions.get(session_id)
+
+        with self._lock:
+            self.in_flight += 1
+        try:
+            recognizer = self._lock_recognizer(session_id, recognizer)
+            try:
+                result = recognizer.process_landmarks(landmarks, timestamp)
+            finally:
+                recognizer.lock.release()
+            with self._lock:
+                if result.get("dropped"):
+                    self.dropped += 1
+                else:
+                    self.processed += 1
+            return self._with_hint(recognizer, result)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _lock_recognizer(self, session_id, recognizer, seq=None):
+        """Toma el lock del reconocedor; si lo desalojaron mientras tanto usa el que tenga ahora la sesión"""
+        while True:
+            recognizer.lock.acquire()
+            if not recognizer.closed:
+                return recognizer
+            recognizer.lock.release()
+
+            recognizer = self.sessions.get(session_id)
+            if seq is not None:
+                recognizer.order.mark_ready(seq)
+
+    def _with_hint(self, recognizer, result):
+        """Agrega al resultado el ritmo de captura sugerido según la sesión y la carga"""
+        with self._lock:
+            load = self.in_flight / self.workers
+        result.update(recognizer.capture_hint(load))
+        return result
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "processed": self.processed,
+                "dropped": self.dropped,
+            }
@@ -0,0 +1,243 @@
+"""
+Backends de inferencia para el modelo dinámico de señas
+keras  → llamada directa model(x, training=False) con tf.function pre-trazada
+tflite → intérprete TFLite (tflite_runtime si está instalado, evita importar TensorFlow)
+onnx   → ONNX Runtime
+
+Uso:
+    python modelo_dinamico.py export tflite|onnx
+    python modelo_dinamico.py export tflite --cuantizar   # pesos int8: más chico, salidas aproximadas
+    python modelo_dinamico.py bench [n]     # paridad y latencia contra Keras predict
+"""
+
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+H5_PATH = "sequence_model.h5"
+TFLITE_PATH = "sequence_model.tflite"
+ONNX_PATH = "sequence_model.onnx"
+
+SEQUENCE_LENGTH = 30
+FEATURES = 126
+
+# Diferencia máxima aceptada contra Keras predict en bench (exportaciones en float32)
+PARITY_TOLERANCE = 1e-4
+
+
+class KerasBackend:
+    """Keras sin el overhead de predict(): una tf.function trazada una sola vez"""
+
+    name = "keras"
+
+    def __init__(self, path=H5_PATH):
+        import tensorflow as tf
+
+        self.model = tf.keras.models.load_model(path)
+        self._fn = tf.function(
+            lambda x: self.model(x, training=False),
+            input_signature=[tf.TensorSpec([None, SEQUENCE_LENGTH, FEATURES], tf.float32)]
+        )
+
+    def predict(self, batch):
+        return self._fn(batch).numpy()
+
+
+class TFLiteBackend:
+    name = "tflite"
+
+    def __init__(self, path=TFLITE_PATH):
+        if not os.path.exists(path):
+            export_tflite(path)
+
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self.interpreter = Interpreter(model_path=path)
+        # El intérprete guarda tensores de entrada/salida: una inferencia a la vez
+        self._lock = threading.Lock()
+        input_details = self.interpreter.get_input_details()[0]
+        self._input = input_details["index"]
+        self._output = self.interpreter.get_output_details()[0]["index"]
+        # Modelos exportados con batch fijo (1) se evalúan fila por fila
+        self._fixed_batch = input_details["shape_signature"][0] != -1
+        self._batch_size = None
+        if self._fixed_batch:
+            self.interpreter.allocate_tensors()
+
+    def predict(self, batch):
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        with self._lock:
+            if self._fixed_batch:
+                return np.concatenate([self._invoke(batch[i:i + 1]) for i in range(batch.shape[0])])
+
+            if batch.shape[0] != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input, batch.shape)
+                self.interpreter.allocate_tensors()
+                self._batch_size = batch.shape[0]
+            return self._invoke(batch)
+
+    def _invoke(self, batch):
+        self.interpreter.set_tensor(self._input, batch)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self._output)
+
+
+class OnnxBackend:
+    name = "onnx"
+
+    def __init__(self, path=ONNX_PATH):
+        if not os.path.exists(path):
+            export_onnx(path)
+
+        import onnxruntime as ort
+
+        self.session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        self._input = self.session.get_inputs()[0].name
+
+    def predict(self, batch):
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        return self.session.run(None, {self._input: batch})[0]
+
+
+BACKENDS = {
+    "keras": KerasBackend,
+    "tflite": TFLiteBackend,
+    "onnx": OnnxBackend,
+}
+
+
+def load_dynamic_backend(name="keras"):
+    """Carga el backend configurado; si falla, vuelve a Keras"""
+    backend_class = BACKENDS.get(name)
+    if backend_class is None:
+        print(f"⚠️ Backend dinámico desconocido '{name}', usando keras")
+        backend_class = KerasBackend
+
+    try:
+        return backend_class()
+    except Exception as e:
+        if backend_class is KerasBackend:
+            raise
+        print(f"⚠️ No se pudo cargar backend {backend_class.name} ({e}), usando keras")
+        return KerasBackend()
+
+
+# ====================================
+#        EXPORTAR
+# ====================================
+
+def _temporal(path):
+    """Archivo temporal por proceso: varios workers pueden exportar a la vez y
+    ninguno debe leer un modelo a medio escribir (se publica con os.replace)"""
+    return f"{path}.{os.getpid()}.tmp"
+
+
+def export_tflite(path=TFLITE_PATH, h5_path=H5_PATH, quantize=False):
+    """Exporta en float32 (mismas salidas que Keras); quantize=True cuantiza los pesos a int8"""
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(h5_path)
+
+    # Con batch fijo en 1 las LSTM se convierten a ops nativas de TFLite
+    # y el archivo corre con tflite_runtime (sin TensorFlow)
+    fn = tf.function(lambda x: model(x, training=False)).get_concrete_function(
+        tf.TensorSpec([1, SEQUENCE_LENGTH, FEATURES], tf.float32)
+    )
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([fn], model)
+    if quantize:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    try:
+        tflite_model = converter.convert()
+    except Exception:
+        # Si hay capas sin equivalente nativo, batch dinámico con ops de TF (requiere TensorFlow)
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        if quantize:
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_ops = [
+            tf.lite.OpsSet.TFLITE_BUILTINS,
+            tf.lite.OpsSet.SELECT_TF_OPS,
+        ]
+        tflite_model = converter.convert()
+
+    temporal = _temporal(path)
+    with open(temporal, "wb") as f:
+        f.write(tflite_model)
+    os.replace(temporal, path)
+    print(f"✅ Modelo exportado a {path}")
+
+
+def export_onnx(path=ONNX_PATH, h5_path=H5_PATH):
+    import tensorflow as tf
+    import tf2onnx
+
+    model = tf.keras.models.load_model(h5_path)
+    spec = (tf.TensorSpec([None, SEQUENCE_LENGTH, FEATURES], tf.float32, name="input"),)
+    temporal = _temporal(path)
+    tf2onnx.convert.from_keras(model, input_signature=spec, output_path=temporal)
+    os.replace(temporal, path)
+    print(f"✅ Modelo exportado a {path}")
+
+
+# ====================================
+#        PARIDAD Y LATENCIA
+# ====================================
+
+def _latency_ms(fn, batch, repeats):
+    fn(batch)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(batch)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def bench(repeats=50):
+    """Compara cada backend contra Keras predict: diferencia máxima, argmax y ms por ventana.
+
+    Una exportación cuantizada (--cuantizar) no pasa la paridad: solo conserva la clase.
+    """
+    import tensorflow as tf
+
+    reference = tf.keras.models.load_model(H5_PATH)
+    batch = np.random.default_rng(0).uniform(-1, 1, (1, SEQUENCE_LENGTH, FEATURES)).astype(np.float32)
+    expected = reference.predict(batch, verbose=0)
+    base_ms = _latency_ms(lambda x: reference.predict(x, verbose=0), batch, repeats)
+    print(f"keras predict: {base_ms:.2f} ms")
+
+    ok = True
+    for name, backend_class in BACKENDS.items():
+        try:
+            backend = backend_class()
+        except Exception as e:
+            print(f"{name}: no disponible ({e})")
+            continue
+
+        got = backend.predict(batch)
+        diff = float(np.max(np.abs(got - expected)))
+        same_class = bool(np.argmax(got) == np.argmax(expected))
+        ms = _latency_ms(backend.predict, batch, repeats)
+        ok = ok and same_class and diff < PARITY_TOLERANCE
+        print(f"{name}: {ms:.2f} ms ({base_ms / ms:.1f}x) | diff máx {diff:.2e} | misma clase: {same_class}")
+
+    return ok
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "export":
+        if sys.argv[2] == "tflite":
+            export_tflite(quantize="--cuantizar" in sys.argv[3:])
+        else:
+            {"onnx": export_onnx}[sys.argv[2]]()
+    elif len(sys.argv) > 1 and sys.argv[1] == "bench":
+        repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+        sys.exit(0 if bench(repeats) else 1)
+    else:
+        print(__doc__)
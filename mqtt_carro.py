@@ -0,0 +1,487 @@
+"""
+Cliente MQTT del carro
+Una sola conexión persistente al broker (con reconexión automática) compartida por
+todas las peticiones. Publica los mismos formatos que espera esp32_mqtt_bridge.ino:
+    looky/control     DIRECCION:VELOCIDAD   (ADELANTE, ATRAS, IZQUIERDA, DERECHA, DETENER; 0-100)
+    looky/autonomo    ON | OFF
+    looky/emergencia  STOP
+Mientras se mantiene un botón, los comandos intermedios se fusionan y solo se
+envía el último. La emergencia no pasa por la cola y va con QoS 1.
+
+Lo que el ESP32 publica en looky/status (respuestas del Arduino y el last-will
+ONLINE/OFFLINE) se interpreta en TelemetriaCarro y se reparte a los navegadores.
+"""
+
+import bisect
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, asdict
+
+TOPIC_CONTROL = "looky/control"
+TOPIC_STATUS = "looky/status"
+TOPIC_AUTONOMO = "looky/autonomo"
+TOPIC_EMERGENCIA = "looky/emergencia"
+
+DIRECCIONES = ("ADELANTE", "ATRAS", "IZQUIERDA", "DERECHA", "DETENER")
+
+
+def formatear_control(direccion, velocidad):
+    """('adelante', '70') → 'ADELANTE:70'; lanza ValueError si la dirección no existe"""
+    direccion = str(direccion).strip().upper()
+    if direccion == "STOP":
+        direccion = "DETENER"
+    if direccion not in DIRECCIONES:
+        raise ValueError(f"Dirección no válida: {direccion}")
+    velocidad = 0 if direccion == "DETENER" else max(0, min(100, int(float(velocidad))))
+    return f"{direccion}:{velocidad}"
+
+
+class ClienteMQTTLocal:
+    """Sustituto en memoria de paho.mqtt.Client para pruebas y desarrollo sin broker.
+
+    Guarda lo publicado en `mensajes` y entrega a los suscriptores como lo haría el broker.
+    `simular_mensaje` inyecta mensajes como si vinieran del ESP32.
+    """
+
+    class _Mensaje:
+        def __init__(self, topic, payload, qos, retain):
+            self.topic = topic
+            self.payload = payload if isinstance(payload, bytes) else str(payload).encode()
+            self.qos = qos
+            self.retain = retain
+
+    def __init__(self):
+        self.mensajes = []
+        self.suscripciones = set()
+        self.on_connect = None
+        self.on_disconnect = None
+        self.on_message = None
+        self._lock = threading.Lock()
+
+    def reconnect_delay_set(self, min_delay=1, max_delay=120):
+        pass
+
+    def connect_async(self, host, port=1883, keepalive=60):
+        self._host = host
+
+    def loop_start(self):
+        if self.on_connect:
+            self.on_connect(self, None, {}, 0)
+
+    def loop_stop(self):
+        pass
+
+    def disconnect(self):
+        if self.on_disconnect:
+            self.on_disconnect(self, None, 0)
+
+    def subscribe(self, topic, qos=0):
+        self.suscripciones.add(topic)
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        mensaje = self._Mensaje(topic, payload, qos, retain)
+        with self._lock:
+            self.mensajes.append(mensaje)
+        if topic in self.suscripciones and self.on_message:
+            self.on_message(self, None, mensaje)
+
+    def simular_mensaje(self, topic, payload):
+        if self.on_message:
+            self.on_message(self, None, self._Mensaje(topic, payload, 0, False))
+
+
+# ====================================
+#   Telemetría (looky/status)
+# ====================================
+
+@dataclass(frozen=True)
+class EventoTelemetria:
+    """Mensaje de looky/status ya interpretado: conexion | movimiento | modo | distancia | alerta | mensaje"""
+    seq: int
+    tipo: str
+    valor: object
+    texto: str
+    momento: float
+
+
+_DISTANCIA = re.compile(r"📏\s*(?:([\d.]+)\s*cm|(Libre))", re.IGNORECASE)
+
+
+def interpretar_status(texto):
+    """'OK:ADELANTE' → ('movimiento', 'ADELANTE'), '📏 12.5 cm' → ('distancia', 12.5), ..."""
+    texto = texto.strip()
+    mayusculas = texto.upper()
+
+    if mayusculas in ("ONLINE", "OFFLINE"):
+        return "conexion", mayusculas == "ONLINE"
+    if mayusculas.startswith("OK:"):
+        direccion = mayusculas[3:]
+        return "movimiento", "DETENER" if direccion == "STOP" else direccion
+    if mayusculas in ("AUTO:ON", "AUTO_ON", "AUTO:OFF", "AUTO_OFF"):
+        return "modo", mayusculas.endswith("ON")
+
+    distancia = _DISTANCIA.search(texto)
+    if distancia:
+        # 'Libre' = nada a menos de 50 cm
+        return "distancia", float(distancia.group(1)) if distancia.group(1) else None
+    if "PELIGRO" in mayusculas or "OBSTÁCULO" in mayusculas or "OBSTACULO" in mayusculas:
+        return "alerta", texto
+    return "mensaje", texto
+
+
+class TelemetriaCarro:
+    """Último estado conocido del carro + historial acotado de eventos para quien se conecta tarde"""
+
+    def __init__(self, historial=200):
+        self._historial = deque(maxlen=historial)
+        self._cambio = threading.Condition()
+        self._seq = 0
+        self.estado = {
+            'conectado': None,
+            'movimiento': None,
+            'modo_autonomo': None,
+            'distancia_cm': None,
+            'alerta': None,
+            'mensaje': None,
+            'actualizado': {},
+        }
+
+    _CAMPOS = {
+        'conexion': 'conectado',
+        'movimiento': 'movimiento',
+        'modo': 'modo_autonomo',
+        'distancia': 'distancia_cm',
+        'alerta': 'alerta',
+        'mensaje': 'mensaje',
+    }
+
+    def registrar(self, texto, momento=None):
+        tipo, valor = interpretar_status(texto)
+        with self._cambio:
+            self._seq += 1
+            evento = EventoTelemetria(self._seq, tipo, valor, texto, momento or time.time())
+            campo = self._CAMPOS[tipo]
+            self.estado[campo] = valor
+            self.estado['actualizado'][campo] = evento.momento
+            self._historial.append(evento)
+            self._cambio.notify_all()
+        return evento
+
+    def eventos_desde(self, seq):
+        with self._cambio:
+            return [asdict(evento) for evento in self._historial if evento.seq > seq]
+
+    def esperar(self, seq, timeout):
+        """Eventos posteriores a `seq`; bloquea hasta que llegue alguno o pase el timeout"""
+        with self._cambio:
+            self._cambio.wait_for(lambda: self._seq > seq, timeout)
+        return self.eventos_desde(seq)
+
+    def instantanea(self):
+        with self._cambio:
+            return {**self.estado, 'actualizado': dict(self.estado['actualizado']), 'seq': self._seq}
+
+
+# ====================================
+#   Canal de control de baja latencia (/ws/carro)
+# ====================================
+
+class HistogramaLatencia:
+    """Conteo por cubetas en ms (límite superior inclusivo); la última cubeta es '+inf'"""
+
+    LIMITES = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cubetas = [0] * (len(self.LIMITES) + 1)
+        self.total = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+
+    def registrar(self, ms):
+        with self._lock:
+            self.cubetas[bisect.bisect_left(self.LIMITES, ms)] += 1
+            self.total += 1
+            self.suma += ms
+            self.maximo = max(self.maximo, ms)
+
+    def a_dict(self):
+        with self._lock:
+            # Lista y no dict: jsonify ordena las claves y perdería el orden de las cubetas
+            limites = list(self.LIMITES) + [None]
+            return {
+                'cubetas': [{'hasta_ms': limite, 'conteo': conteo} for limite, conteo in zip(limites, self.cubetas)],
+                'total': self.total,
+                'media_ms': round(self.suma / self.total, 2) if self.total else 0.0,
+                'max_ms': round(self.maximo, 2),
+            }
+
+
+# Compartidos por todos los canales del proceso
+latencias = {
+    'rtt': HistogramaLatencia(),          # latido del servidor → pong del cliente
+    'antiguedad': HistogramaLatencia(),   # retraso del comando respecto al mejor observado
+    'procesamiento': HistogramaLatencia(),  # recepción → comando entregado al cliente MQTT
+}
+
+
+class CanalControl:
+    """Estado de una conexión de manejo, independiente del transporte.
+
+    Mensajes del cliente (JSON):
+        {tipo: 'control', seq, t, direccion, velocidad}   t = reloj del cliente en ms
+        {tipo: 'velocidad', seq, t, velocidad}
+        {tipo: 'emergencia'} | {tipo: 'autonomo', activado}
+        {tipo: 'pong', t, tc}                             respuesta al latido del servidor
+    Se descartan los comandos con seq repetida o anterior y los que llegan con más de
+    `plazo_ms` de retraso. El desfase de relojes se estima con el mínimo observado de
+    (llegada - t), así que la antigüedad medida es el retraso extra sobre el mejor caso.
+    Si el cliente deja de hablar `latido_perdido` segundos con el carro en movimiento,
+    se publica DETENER.
+    """
+
+    def __init__(self, carro, plazo_ms=300, latido=0.5, latido_perdido=1.5):
+        self.carro = carro
+        self.plazo_ms = plazo_ms
+        self.latido = latido
+        self.latido_perdido = latido_perdido
+
+        self.ultimo_seq = -1
+        self.desfase_ms = None
+        self.ultimo_mensaje = time.monotonic()
+        self.ultimo_latido = 0.0
+        self.en_movimiento = False
+        self.descartados = 0
+        self.paradas_automaticas = 0
+
+    @staticmethod
+    def _ahora_ms():
+        return time.time() * 1000
+
+    def _antiguedad(self, t_cliente, llegada_ms):
+        """Retraso del mensaje respecto al más rápido visto; actualiza la estimación del desfase"""
+        if t_cliente is None:
+            return 0.0
+        desfase = llegada_ms - float(t_cliente)
+        if self.desfase_ms is None or desfase < self.desfase_ms:
+            self.desfase_ms = desfase
+        return desfase - self.desfase_ms
+
+    def recibir(self, mensaje):
+        """Procesa un mensaje del cliente; devuelve la lista de respuestas a enviar"""
+        llegada = time.perf_counter()
+        llegada_ms = self._ahora_ms()
+        self.ultimo_mensaje = time.monotonic()
+        tipo = mensaje.get('tipo')
+
+        if tipo == 'pong':
+            if mensaje.get('t') is not None:
+                latencias['rtt'].registrar(llegada_ms - float(mensaje['t']))
+            self._antiguedad(mensaje.get('tc'), llegada_ms)
+            return []
+
+        if tipo == 'emergencia':
+            self.carro.emergencia()
+            self.en_movimiento = False
+            return [{'tipo': 'ack', 'comando': 'EMERGENCIA'}]
+
+        if tipo == 'autonomo':
+            self.carro.modo_autonomo(bool(mensaje.get('activado')))
+            return [{'tipo': 'ack', 'comando': 'AUTONOMO'}]
+
+        if tipo not in ('control', 'velocidad'):
+            return [{'tipo': 'error', 'mensaje': f"Tipo no reconocido: {tipo}"}]
+
+        seq = mensaje.get('seq')
+        if seq is None or seq <= self.ultimo_seq:
+            self.descartados += 1
+            return [{'tipo': 'descartado', 'seq': seq, 'motivo': 'fuera de orden'}]
+
+        antiguedad = self._antiguedad(mensaje.get('t'), llegada_ms)
+        latencias['antiguedad'].registrar(antiguedad)
+        self.ultimo_seq = seq
+        if antiguedad > self.plazo_ms:
+            self.descartados += 1
+            return [{'tipo': 'descartado', 'seq': seq, 'motivo': f'vencido ({antiguedad:.0f} ms)'}]
+
+        try:
+            if tipo == 'velocidad':
+                self.carro.actualizar_velocidad(mensaje.get('velocidad', self.carro.velocidad))
+                comando = self.carro.ultimo_control
+            else:
+                comando = self.carro.enviar_control(mensaje.get('direccion', ''), mensaje.get('velocidad'))
+        except ValueError as e:
+            return [{'tipo': 'error', 'seq': seq, 'mensaje': str(e)}]
+
+        self.en_movimiento = bool(comando) and not comando.startswith("DETENER")
+        latencias['procesamiento'].registrar((time.perf_counter() - llegada) * 1000)
+        return [{'tipo': 'ack', 'seq': seq, 'comando': comando}]
+
+    def revisar(self):
+        """Llamar periódicamente: latido hacia el cliente y parada si el cliente calla"""
+        ahora = time.monotonic()
+        respuestas = []
+
+        if self.en_movimiento and ahora - self.ultimo_mensaje > self.latido_perdido:
+            self.carro.enviar_control("DETENER", 0)
+            self.en_movimiento = False
+            self.paradas_automaticas += 1
+            print("⚠️ Latido perdido: carro detenido")
+            respuestas.append({'tipo': 'detenido', 'motivo': 'latido perdido'})
+
+        if ahora - self.ultimo_latido >= self.latido:
+            self.ultimo_latido = ahora
+            respuestas.append({'tipo': 'latido', 't': self._ahora_ms()})
+
+        return respuestas
+
+    def cerrar(self):
+        """El socket se cerró: no dejar el carro andando"""
+        if self.en_movimiento:
+            self.carro.enviar_control("DETENER", 0)
+            self.en_movimiento = False
+            self.paradas_automaticas += 1
+
+
+def crear_cliente_paho(cliente_id):
+    import paho.mqtt.client as mqtt
+
+    try:
+        # paho-mqtt 2.x pide la versión de la API de callbacks
+        return mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, client_id=cliente_id)
+    except AttributeError:
+        return mqtt.Client(client_id=cliente_id)
+
+
+class ClienteCarro:
+    def __init__(self, broker="", puerto=1883, intervalo=0.05, cliente=None):
+        """broker vacío = ClienteMQTTLocal (no sale nada a la red)"""
+        self.broker = broker
+        self.puerto = puerto
+        self.intervalo = intervalo  # separación mínima entre comandos de control
+        self.conectado = False
+        self.velocidad = 50
+        self.ultimo_control = None
+
+        self.publicados = 0
+        self.fusionados = 0
+        self.telemetria = TelemetriaCarro()
+
+        self._pendiente = None
+        self._hay_pendiente = threading.Condition()
+        # Un DETENER o una emergencia invalidan el comando que el hilo ya había tomado
+        self._generacion = 0
+        self._publicacion = threading.Lock()
+        self._cerrado = False
+
+        if cliente is None:
+            cliente = crear_cliente_paho(f"looky-servidor-{uuid.uuid4().hex[:8]}") if broker else ClienteMQTTLocal()
+        self.cliente = cliente
+        self.cliente.on_connect = self._al_conectar
+        self.cliente.on_disconnect = self._al_desconectar
+        self.cliente.on_message = self._al_recibir
+        # paho reintenta solo la conexión con espera creciente hasta 30 s
+        self.cliente.reconnect_delay_set(min_delay=1, max_delay=30)
+        self.cliente.connect_async(broker or "local", puerto, keepalive=30)
+        self.cliente.loop_start()
+
+        self._hilo = threading.Thread(target=self._enviar_controles, name="mqtt-control", daemon=True)
+        self._hilo.start()
+
+    def _al_conectar(self, cliente, userdata, flags, rc):
+        self.conectado = rc == 0
+        if self.conectado:
+            # Suscribirse en cada conexión: tras una reconexión la sesión es nueva
+            cliente.subscribe(TOPIC_STATUS, qos=1)
+            print(f"✅ MQTT conectado a {self.broker or 'broker local'}")
+        else:
+            print(f"⚠️ MQTT rechazó la conexión (rc={rc})")
+
+    def _al_desconectar(self, cliente, userdata, rc):
+        self.conectado = False
+        if rc != 0:
+            print(f"⚠️ MQTT desconectado (rc={rc}), reintentando...")
+
+    def _al_recibir(self, cliente, userdata, mensaje):
+        if mensaje.topic == TOPIC_STATUS:
+            self.telemetria.registrar(mensaje.payload.decode("utf-8", errors="replace"))
+
+    def _publicar(self, topic, payload, qos=0):
+        self.cliente.publish(topic, payload, qos=qos)
+        self.publicados += 1
+
+    def _enviar_controles(self):
+        """Publica el último comando pendiente, como máximo uno cada `intervalo`"""
+        while True:
+            with self._hay_pendiente:
+                self._hay_pendiente.wait_for(lambda: self._pendiente is not None or self._cerrado)
+                if self._cerrado:
+                    return
+                payload, self._pendiente = self._pendiente, None
+                generacion = self._generacion
+
+            with self._publicacion:
+                if generacion == self._generacion:
+                    self._publicar(TOPIC_CONTROL, payload)
+            time.sleep(self.intervalo)
+
+    def _descartar_pendiente(self):
+        with self._hay_pendiente:
+            self._pendiente = None
+            self._generacion += 1
+
+    # ============ API ============
+
+    def enviar_control(self, direccion, velocidad=None):
+        """Encola DIRECCION:VELOCIDAD; si ya había uno sin enviar se reemplaza"""
+        payload = formatear_control(direccion, self.velocidad if velocidad is None else velocidad)
+        if payload.startswith("DETENER"):
+            # Detener no espera detrás de otros comandos
+            self._descartar_pendiente()
+            with self._publicacion:
+                self._publicar(TOPIC_CONTROL, payload, qos=1)
+        else:
+            with self._hay_pendiente:
+                if self._pendiente is not None:
+                    self.fusionados += 1
+                self._pendiente = payload
+                self._hay_pendiente.notify()
+        self.ultimo_control = payload
+        return payload
+
+    def actualizar_velocidad(self, velocidad):
+        """Cambia la velocidad; si el carro se está moviendo reenvía la dirección actual"""
+        self.velocidad = max(0, min(100, int(float(velocidad))))
+        if self.ultimo_control and not self.ultimo_control.startswith("DETENER"):
+            self.enviar_control(self.ultimo_control.split(":")[0], self.velocidad)
+        return self.velocidad
+
+    def modo_autonomo(self, activado):
+        self._publicar(TOPIC_AUTONOMO, "ON" if activado else "OFF", qos=1)
+
+    def emergencia(self):
+        """Descarta lo pendiente y publica la parada sin pasar por la cola"""
+        self._descartar_pendiente()
+        with self._publicacion:
+            self._publicar(TOPIC_EMERGENCIA, "STOP", qos=1)
+        self.ultimo_control = "DETENER:0"
+
+    def metricas(self):
+        return {
+            'broker': self.broker or 'local',
+            'conectado': self.conectado,
+            'publicados': self.publicados,
+            'fusionados': self.fusionados,
+            'ultimo_control': self.ultimo_control,
+            'velocidad': self.velocidad,
+        }
+
+    def cerrar(self):
+        with self._hay_pendiente:
+            self._cerrado = True
+            self._hay_pendiente.notify()
+        self.cliente.loop_stop()
+        self.cliente.disconnect()
@@ -0,0 +1,140 @@
+"""
+Pool persistente de workers de voz
+Cada worker importa speech_recognition una sola vez y atiende solicitudes
+tipadas en lugar de lanzar un proceso por petición. Solo el reconocimiento con
+el micrófono del servidor corre aquí; traducción y síntesis se resuelven en el
+propio servidor (traduccion.py y el pool de motores de sintesis_voz.py).
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class SolicitudVoz:
+    """Tarea de voz: 'voz_a_texto', 'texto_a_voz', 'voz_traductor' o 'texto_traducido'.
+
+    El pool solo ejecuta 'voz_a_texto'; las demás las atiende el servidor.
+    """
+    tarea: str
+    texto: str = ""
+    idioma: str = "en"
+
+
+@dataclass(frozen=True)
+class RespuestaVoz:
+    ok: bool
+    texto: str = ""
+    error: str = ""
+
+
+# ====================================
+#   Código que corre dentro del worker
+# ====================================
+
+def _inicializar_worker():
+    """Se ejecuta una vez por proceso: paga aquí el costo de arranque"""
+    # Si falla no debe tumbar el worker: solo fallarán sus tareas
+    try:
+        import voz_a_texto  # noqa: F401
+    except Exception as e:
+        print(f"⚠️ Worker de voz sin voz_a_texto: {e}")
+
+
+def _separar_error(resultado):
+    """Convierte el formato 'ERROR: ...' de los scripts en una respuesta tipada"""
+    if resultado.startswith("ERROR:"):
+        return RespuestaVoz(ok=False, error=resultado.replace("ERROR:", "", 1).strip())
+    return RespuestaVoz(ok=True, texto=resultado)
+
+
+def _tarea_voz_a_texto(solicitud):
+    import voz_a_texto
+    return _separar_error(voz_a_texto.reconocer_voz())
+
+
+_TAREAS = {
+    "voz_a_texto": _tarea_voz_a_texto,
+}
+
+
+def _ejecutar(solicitud):
+    tarea = _TAREAS.get(solicitud.tarea)
+    if tarea is None:
+        return RespuestaVoz(ok=False, error=f"Tarea no reconocida: {solicitud.tarea}")
+    try:
+        return tarea(solicitud)
+    except Exception as e:
+        return RespuestaVoz(ok=False, error=f"Error ejecutando {solicitud.tarea}: {e}")
+
+
+def _ping():
+    return True
+
+
+# ====================================
+#   Lado del servidor
+# ====================================
+
+def _contexto():
+    """forkserver (spawn en Windows): los workers no heredan un fork del servidor.
+
+    El servidor puede tener ya TensorFlow, MediaPipe y los hilos del scheduler de
+    señas cargados cuando arranca el pool, y un fork de ese proceso no es seguro.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+class PoolVoz:
+    def __init__(self, tamano, timeout=30):
+        self.tamano = tamano
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _obtener_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.tamano,
+                    mp_context=_contexto(),
+                    initializer=_inicializar_worker
+                )
+            return self._executor
+
+    def _reiniciar(self, executor):
+        """Descarta un pool roto (un worker murió) para crear otro en la siguiente petición"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def calentar(self):
+        """Arranca todos los workers para que la primera petición no pague el arranque"""
+        executor = self._obtener_executor()
+        futuros = [executor.submit(_ping) for _ in range(self.tamano)]
+        for futuro in futuros:
+            futuro.result()
+        print(f"✅ Pool de voz listo ({self.tamano} workers)")
+
+    def ejecutar(self, solicitud, timeout=None):
+        executor = self._obtener_executor()
+        try:
+            futuro = executor.submit(_ejecutar, solicitud)
+            return futuro.result(timeout=timeout or self.timeout)
+        except TimeoutError:
+            return RespuestaVoz(ok=False, error=f"Timeout en {solicitud.tarea}")
+        except BrokenProcessPool:
+            self._reiniciar(executor)
+            return RespuestaVoz(ok=False, error=f"Worker de voz terminó inesperadamente en {solicitud.tarea}")
+
+    def cerrar(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,227 @@
+"""
+Reconocimiento de voz a partir de audio enviado por el navegador
+El cliente transmite PCM16 mono; un VAD por energía detecta el final de cada
+frase y el reconocimiento arranca en cuanto la frase se cierra, sin esperar
+al resto del audio ni calibrar un micrófono del servidor.
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import config
+
+SAMPLE_RATE = 16000
+# Rango aceptado para el sample rate que informa el cliente
+SAMPLE_RATE_MIN = 8000
+SAMPLE_RATE_MAX = 48000
+BYTES_MUESTRA = 2  # PCM16
+MS_BLOQUE = 20
+
+
+class DetectorFrases:
+    """VAD por energía (RMS) sobre bloques de 20 ms.
+
+    El umbral sigue al ruido de fondo con una media móvil de los bloques sin voz.
+    Una frase se cierra tras `silencio_fin` segundos de silencio o al llegar a `max_frase`.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, umbral_minimo=300, factor=3.0,
+                 silencio_fin=0.6, min_frase=0.25, max_frase=8.0, pre_voz=0.3):
+        self.sample_rate = sample_rate
+        self.bytes_bloque = sample_rate * MS_BLOQUE // 1000 * BYTES_MUESTRA
+        if self.bytes_bloque <= 0:
+            # Con bloques vacíos agregar() no terminaría nunca
+            raise ValueError(f"Sample rate inválido: {sample_rate}")
+        self.umbral_minimo = umbral_minimo
+        self.factor = factor
+        self.bloques_silencio_fin = int(silencio_fin * 1000 / MS_BLOQUE)
+        self.bloques_min_frase = int(min_frase * 1000 / MS_BLOQUE)
+        self.bloques_max_frase = int(max_frase * 1000 / MS_BLOQUE)
+
+        self.ruido = float(umbral_minimo) / factor
+        self._pendiente = bytearray()
+        self._previos = deque(maxlen=int(pre_voz * 1000 / MS_BLOQUE))
+        self._frase = bytearray()
+        self._bloques_voz = 0
+        self._bloques_frase = 0
+        self._silencio = 0
+
+    @property
+    def umbral(self):
+        return max(self.umbral_minimo, self.ruido * self.factor)
+
+    def _energia(self, bloque):
+        muestras = np.frombuffer(bloque, dtype=np.int16).astype(np.float32)
+        return float(np.sqrt(np.mean(muestras * muestras)))
+
+    def agregar(self, datos):
+        """Procesa un trozo de audio; devuelve la lista de frases (bytes PCM16) que se cerraron"""
+        self._pendiente.extend(datos)
+        frases = []
+
+        while len(self._pendiente) >= self.bytes_bloque:
+            bloque = bytes(self._pendiente[:self.bytes_bloque])
+            del self._pendiente[:self.bytes_bloque]
+
+            energia = self._energia(bloque)
+            es_voz = energia > self.umbral
+
+            if not self._frase:
+                if es_voz:
+                    # Incluir un poco de audio previo para no cortar el inicio de la palabra
+                    self._frase.extend(b"".join(self._previos))
+                    self._previos.clear()
+                    self._frase.extend(bloque)
+                    self._bloques_voz = self._bloques_frase = 1
+                    self._silencio = 0
+                else:
+                    self.ruido = 0.95 * self.ruido + 0.05 * energia
+                    self._previos.append(bloque)
+                continue
+
+            self._frase.extend(bloque)
+            self._bloques_frase += 1
+            if es_voz:
+                self._bloques_voz += 1
+                self._silencio = 0
+            else:
+                self._silencio += 1
+
+            if self._silencio >= self.bloques_silencio_fin or self._bloques_frase >= self.bloques_max_frase:
+                frase = self._cerrar_frase()
+                if frase:
+                    frases.append(frase)
+
+        return frases
+
+    def _cerrar_frase(self):
+        frase = bytes(self._frase) if self._bloques_voz >= self.bloques_min_frase else None
+        self._frase.clear()
+        self._bloques_voz = self._bloques_frase = self._silencio = 0
+        return frase
+
+    def terminar(self):
+        """Fin del audio: devuelve la frase en curso si la hay"""
+        frase = self._cerrar_frase() if self._frase else None
+        self._pendiente.clear()
+        return [frase] if frase else []
+
+
+# ====================================
+#   Reconocedores
+# ====================================
+
+class ErrorReconocimiento(Exception):
+    pass
+
+
+class ReconocedorVoz:
+    """Interfaz: PCM16 mono → texto"""
+
+    nombre = "base"
+
+    def reconocer(self, pcm, sample_rate=SAMPLE_RATE, idioma="es-ES"):
+        raise NotImplementedError
+
+
+class ReconocedorGoogle(ReconocedorVoz):
+    nombre = "google"
+
+    def __init__(self):
+        import speech_recognition as sr
+        self._sr = sr
+        self._local = threading.local()
+
+    def reconocer(self, pcm, sample_rate=SAMPLE_RATE, idioma="es-ES"):
+        recognizer = getattr(self._local, "recognizer", None)
+        if recognizer is None:
+            recognizer = self._local.recognizer = self._sr.Recognizer()
+
+        audio = self._sr.AudioData(pcm, sample_rate, BYTES_MUESTRA)
+        try:
+            return recognizer.recognize_google(audio, language=idioma)
+        except self._sr.UnknownValueError:
+            raise ErrorReconocimiento("No se pudo entender el audio.")
+        except self._sr.RequestError as e:
+            raise ErrorReconocimiento(f"Error en el servicio: {e}")
+
+
+class ReconocedorLocal(ReconocedorVoz):
+    """Sustituto sin red para pruebas: describe la frase en lugar de transcribirla"""
+
+    nombre = "local"
+
+    def reconocer(self, pcm, sample_rate=SAMPLE_RATE, idioma="es-ES"):
+        segundos = len(pcm) / (sample_rate * BYTES_MUESTRA)
+        return f"[frase de {segundos:.1f} s]"
+
+
+RECONOCEDORES = {
+    "google": ReconocedorGoogle,
+    "local": ReconocedorLocal,
+}
+
+_reconocedor = None
+_executor = None
+_lock = threading.Lock()
+
+
+def obtener_reconocedor():
+    """Reconocedor configurado y el pool de hilos donde corre (uno por proceso)"""
+    global _reconocedor, _executor
+    with _lock:
+        if _reconocedor is None:
+            clase = RECONOCEDORES.get(config.RECONOCEDOR_VOZ, ReconocedorGoogle)
+            try:
+                _reconocedor = clase()
+            except ImportError as e:
+                print(f"⚠️ Reconocedor {clase.nombre} no disponible ({e}), usando local")
+                _reconocedor = ReconocedorLocal()
+            _executor = ThreadPoolExecutor(max_workers=config.HILOS_RECONOCIMIENTO, thread_name_prefix="stt")
+        return _reconocedor, _executor
+
+
+class SesionDictado:
+    """Une el VAD con el reconocedor: cada frase cerrada se reconoce en segundo plano.
+
+    `agregar` devuelve enseguida; los resultados se recogen con `resultados()`
+    en el mismo orden en que se cerraron las frases.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, idioma="es-ES"):
+        self.sample_rate = sample_rate
+        self.idioma = idioma
+        self.detector = DetectorFrases(sample_rate)
+        self.reconocedor, self._executor = obtener_reconocedor()
+        self._futuros = deque()
+
+    def _reconocer(self, pcm):
+        try:
+            return {'ok': True, 'texto': self.reconocedor.reconocer(pcm, self.sample_rate, self.idioma)}
+        except ErrorReconocimiento as e:
+            return {'ok': False, 'error': str(e)}
+        except Exception as e:
+            return {'ok': False, 'error': f"Error inesperado: {e}"}
+
+    def _enviar(self, frases):
+        for frase in frases:
+            self._futuros.append(self._executor.submit(self._reconocer, frase))
+
+    def agregar(self, datos):
+        self._enviar(self.detector.agregar(datos))
+
+    def terminar(self):
+        self._enviar(self.detector.terminar())
+
+    def pendientes(self):
+        return len(self._futuros)
+
+    def resultados(self, esperar=False):
+        """Resultados listos (en orden); con esperar=True bloquea hasta tener todos"""
+        listos = []
+        while self._futuros and (esperar or self._futuros[0].done()):
+            listos.append(self._futuros.popleft().result())
+        return listos
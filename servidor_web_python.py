@@ -1,141 +1,302 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, after_this_request, send_from_directory, abort
 from flask_cors import CORS
-import subprocess
-import sys
 import json
+import math
 import os
+import re
+import struct
+import threading
+import time
+import uuid
+
+import config
+import reconocimiento_voz
+import sintesis_voz
+import traduccion
+import trabajos
+import mqtt_carro
+from mqtt_carro import ClienteCarro
+from pool_voz import PoolVoz, SolicitudVoz
 
 app = Flask(__name__)
 CORS(app)
 
-# Sign language recognizer (lazy loading)
-sign_recognizer = None
+# WebSocket opcional (flask-sock); sin él solo quedan las rutas HTTP
+try:
+    from flask_sock import Sock
+    sock = Sock(app)
+except ImportError:
+    sock = None
+    print("⚠️  flask-sock no instalado: streaming por WebSocket desactivado")
 
-def get_sign_recognizer():
-    """Inicializar el reconocedor de señas solo cuando se necesita"""
-    global sign_recognizer
-    if sign_recognizer is None:
-        try:
-            # Verificar que existen los modelos
-            if not (os.path.exists('model.joblib') or os.path.exists('model.p')):
-                print("⚠️  Advertencia: No se encontró modelo de señas estático")
-                return None
-            
-            from lenguaje_senas_service import SignLanguageRecognizer
-            sign_recognizer = SignLanguageRecognizer()
-            print("✅ Reconocedor de señas inicializado")
-        except Exception as e:
-            print(f"❌ Error inicializando reconocedor de señas: {e}")
-            return None
-    return sign_recognizer
+# Estado de cada componente para /health: frio | calentando | listo | desactivado | error
+estado_componentes = {
+    'senas': 'frio' if config.SENAS_HABILITADO else 'desactivado',
+    'voz': 'frio',
+}
+inicio_servidor = time.time()
 
-def ejecutar_script_python(script, argumentos=""):
-    """Ejecuta los scripts Python según el comando recibido"""
-    try:
-        print(f"🧠 Ejecutando script: {script}")
-        print(f"📦 Argumentos recibidos: {argumentos}")
-
-        if script == "voz_a_texto":
-            print("🎤 Ejecutando reconocimiento de voz...")
-            resultado = subprocess.run(
-                [sys.executable, "voz_a_texto.py"],
-                capture_output=True, text=True, timeout=30
-            )
-            output = resultado.stdout.strip()
-            print(f"📨 Output voz_a_texto: {output}")
-            
-            if output.startswith("RESULTADO:"):
-                return output.replace("RESULTADO:", "").strip()
-            return output if output else "🎤 Voz a texto completado"
-
-        elif script == "texto_a_voz":
-            print(f"🔊 Ejecutando texto a voz: '{argumentos}'")
-            resultado = subprocess.run(
-                [sys.executable, "texto_a_voz.py", argumentos],
-                capture_output=True, text=True, timeout=30
-            )
-            output = resultado.stdout.strip()
-            print(f"📨 Output texto_a_voz: {output}")
-            return f"🔊 Texto convertido a voz: {argumentos}"
+# Sign language models + sesiones por cliente (lazy loading)
+sign_models = None
+sign_sessions = None
+sign_pipeline = None
+_sign_lock = threading.Lock()
 
-        elif script == "voz_traductor":
-            try:
-                datos = json.loads(argumentos)
-                texto = datos.get('texto', '')
-                idioma = datos.get('idioma', 'en')
-                
-                print(f"🎯 Traduciendo voz: '{texto}' a {idioma}")
-                
-                resultado = subprocess.run(
-                    [sys.executable, "voz_traductor.py", idioma, texto],
-                    capture_output=True, text=True, timeout=30
-                )
-                
-                output = resultado.stdout.strip()
-                error_output = resultado.stderr.strip()
-                
-                print(f"📨 Stdout voz_traductor: {output}")
-                if error_output:
-                    print(f"📨 Stderr voz_traductor: {error_output}")
-                
-                if output.startswith("RESULTADO:"):
-                    return output.replace("RESULTADO:", "").strip()
-                elif output.startswith("ERROR:"):
-                    return output.replace("ERROR:", "").strip()
-                elif output:
-                    return output
-                else:
-                    return "🌐 Traducción de voz completada"
-                    
-            except subprocess.TimeoutExpired:
-                return "❌ Error: Timeout en traducción de voz"
-            except json.JSONDecodeError as e:
-                return f"❌ Error: Formato JSON inválido - {str(e)}"
-            except Exception as e:
-                return f"❌ Error ejecutando traductor voz: {str(e)}"
+SESSION_COOKIE = 'senas_sid'
 
-        elif script == "texto_traducido":
+def precargar_modelos_senas():
+    """Carga el modelo estático antes del fork de gunicorn (preload_app).
+
+    Solo sklearn/numpy: TensorFlow, ONNX Runtime y MediaPipe crean hilos al
+    cargarse y no sobreviven a un fork, así que el modelo dinámico y los
+    trackers se cargan después, en cada worker.
+    """
+    global sign_models
+    if not config.SENAS_HABILITADO or sign_models is not None:
+        return
+    if not (os.path.exists('model.joblib') or os.path.exists('model.p')):
+        return
+
+    from lenguaje_senas_service import SignModels
+    sign_models = SignModels(dynamic_backend=None)
+
+def get_sign_sessions():
+    """Inicializar los modelos de señas y el pool de sesiones solo cuando se necesita"""
+    global sign_sessions, sign_pipeline
+    if not config.SENAS_HABILITADO:
+        return None
+
+    with _sign_lock:
+        if sign_sessions is None:
             try:
-                datos = json.loads(argumentos)
-                texto = datos.get('texto', '')
-                idioma = datos.get('idioma', 'en')
-                
-                print(f"🎯 Traduciendo texto: '{texto}' a {idioma}")
+                # Verificar que existen los modelos
+                if not (os.path.exists('model.joblib') or os.path.exists('model.p')):
+                    print("⚠️  Advertencia: No se encontró modelo de señas estático")
+                    estado_componentes['senas'] = 'error'
+                    return None
                 
-                resultado = subprocess.run(
-                    [sys.executable, "texto_traducido_a_voz.py", idioma, texto],
-                    capture_output=True, text=True, timeout=30
-                )
-                
-                output = resultado.stdout.strip()
-                error_output = resultado.stderr.strip()
-                
-                print(f"📨 Stdout texto_traducido: {output}")
-                if error_output:
-                    print(f"📨 Stderr texto_traducido: {error_output}")
-                
-                if output.startswith("RESULTADO:"):
-                    return output.replace("RESULTADO:", "").strip()
-                elif output.startswith("ERROR:"):
-                    return output.replace("ERROR:", "").strip()
-                elif output:
-                    return output
+                estado_componentes['senas'] = 'calentando'
+                inicio = time.time()
+                from lenguaje_senas_service import SignModels, SignSessionPool, FramePipeline, InferenceScheduler
+                if sign_models is not None:
+                    models = sign_models
+                    models.load_dynamic(config.SENAS_BACKEND_DINAMICO)
                 else:
-                    return "📘 Traducción de texto completada"
-                    
-            except subprocess.TimeoutExpired:
-                return "❌ Error: Timeout en traducción de texto"
-            except json.JSONDecodeError as e:
-                return f"❌ Error: Formato JSON inválido - {str(e)}"
+                    models = SignModels(dynamic_backend=config.SENAS_BACKEND_DINAMICO)
+                scheduler = None
+                if config.SENAS_LOTE_MAX > 1:
+                    scheduler = InferenceScheduler(
+                        models,
+                        max_batch=config.SENAS_LOTE_MAX,
+                        max_wait=config.SENAS_LOTE_ESPERA_MS / 1000
+                    )
+                sessions = SignSessionPool(
+                    models,
+                    scheduler=scheduler,
+                    max_sessions=config.SENAS_MAX_SESIONES,
+                    idle_timeout=config.SENAS_SESION_IDLE,
+                    active_window=config.SENAS_SESION_ACTIVA,
+                    recognizer_options={
+                        'dynamic_stride': config.SENAS_STRIDE_DINAMICO,
+                        'roi_size': config.SENAS_ROI,
+                        'roi_margin': config.SENAS_ROI_MARGEN,
+                        'search_size': config.SENAS_BUSQUEDA,
+                        'static_epsilon': config.SENAS_EPSILON_ESTATICO,
+                    }
+                )
+                # Primera inferencia y grafo de MediaPipe antes de aceptar frames
+                sessions.warmup()
+                sign_pipeline = FramePipeline(sessions, workers=config.SENAS_HILOS_DECODE)
+                sign_sessions = sessions
+                estado_componentes['senas'] = 'listo'
+                print(f"✅ Reconocedor de señas inicializado ({time.time() - inicio:.1f}s)")
             except Exception as e:
-                return f"❌ Error ejecutando traductor texto: {str(e)}"
+                print(f"❌ Error inicializando reconocedor de señas: {e}")
+                estado_componentes['senas'] = 'error'
+                return None
+    return sign_sessions
 
-        else:
-            return f"⚠️ Script no reconocido: {script}"
+def leer_session_id():
+    """Token de sesión del cliente: cabecera X-Senas-Token, ?token= o cookie; None si falta o es inválido"""
+    session_id = (request.headers.get('X-Senas-Token')
+                  or request.args.get('token')
+                  or request.cookies.get(SESSION_COOKIE))
+    if session_id and len(session_id) <= 64:
+        return session_id
+    return None
+
+def get_session_id():
+    """Token de sesión (ver leer_session_id). Si no hay, se crea la cookie"""
+    session_id = leer_session_id()
+    if session_id:
+        return session_id
+
+    session_id = uuid.uuid4().hex
+
+    @after_this_request
+    def guardar_cookie(response):
+        response.set_cookie(SESSION_COOKIE, session_id, httponly=True, samesite='Lax')
+        return response
+
+    return session_id
+
+def get_sign_pipeline():
+    """Pipeline de frames (decodificación en paralelo, clasificación en orden por sesión)"""
+    if get_sign_sessions() is None:
+        return None
+    return sign_pipeline
+
+def get_sign_recognizer(session_id=None):
+    """Reconocedor de la sesión del cliente actual si ya existe (no crea ni desaloja sesiones)"""
+    sessions = get_sign_sessions()
+    if sessions is None:
+        return None
+    return sessions.peek(session_id or get_session_id())
+
+def sesiones_llenas(error):
+    """True si el pool rechazó una sesión nueva porque todas están activas"""
+    from lenguaje_senas_service import SessionPoolFull  # ya cargado por get_sign_sessions
+    return isinstance(error, SessionPoolFull)
+
+def respuesta_sesiones_llenas(error):
+    respuesta = jsonify({'text': '', 'mode': 'error', 'confidence': 0, 'error': str(error)})
+    respuesta.headers['Retry-After'] = str(int(config.SENAS_SESION_ACTIVA))
+    return respuesta, 503
+
+# Pool de workers de voz (lazy loading)
+pool_voz = None
+_pool_voz_lock = threading.Lock()
+
+def get_pool_voz():
+    """Crear el pool de workers de voz solo cuando se necesita"""
+    global pool_voz
+    with _pool_voz_lock:
+        if pool_voz is None:
+            pool_voz = PoolVoz(config.WORKERS_VOZ, timeout=config.TIMEOUT_VOZ)
+        return pool_voz
+
+def calentar_voz():
+    estado_componentes['voz'] = 'calentando'
+    try:
+        get_pool_voz().calentar()
+        sintesis_voz.obtener_pool().calentar()
+        estado_componentes['voz'] = 'listo'
+    except Exception as e:
+        print(f"❌ Error calentando workers de voz: {e}")
+        estado_componentes['voz'] = 'error'
+
+def iniciar_calentamiento():
+    """Carga modelos y workers en segundo plano para que el primer usuario no espere"""
+    if not config.CALENTAR_AL_INICIO:
+        return
 
+    def calentar():
+        if config.SENAS_HABILITADO:
+            get_sign_sessions()
+        calentar_voz()
+
+    threading.Thread(target=calentar, name='calentamiento', daemon=True).start()
+
+def crear_solicitud(script, argumentos=""):
+    """Convierte el script y sus argumentos en una SolicitudVoz; lanza ValueError si no son válidos"""
+    print(f"🧠 Ejecutando script: {script}")
+    print(f"📦 Argumentos recibidos: {argumentos}")
+
+    if script == "voz_a_texto":
+        print("🎤 Ejecutando reconocimiento de voz...")
+        return SolicitudVoz(tarea="voz_a_texto")
+
+    if script == "texto_a_voz":
+        print(f"🔊 Ejecutando texto a voz: '{argumentos}'")
+        return SolicitudVoz(tarea="texto_a_voz", texto=argumentos)
+
+    if script in ("voz_traductor", "texto_traducido"):
+        try:
+            datos = json.loads(argumentos)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Formato JSON inválido - {str(e)}")
+
+        texto = datos.get('texto', '')
+        idioma = datos.get('idioma', 'en')
+        print(f"🎯 Traduciendo ({script}): '{texto}' a {idioma}")
+        return SolicitudVoz(tarea=script, texto=texto, idioma=idioma)
+
+    raise ValueError(f"Script no reconocido: {script}")
+
+def ejecutar_script_python(script, argumentos=""):
+    """Envía el comando recibido al pool de workers de voz"""
+    try:
+        solicitud = crear_solicitud(script, argumentos)
+        respuesta = get_pool_voz().ejecutar(solicitud)
+        print(f"📨 Respuesta {script}: {respuesta}")
+
+        if not respuesta.ok:
+            return f"❌ Error: {respuesta.error}"
+        return respuesta.texto
+
+    except ValueError as e:
+        return f"❌ Error: {str(e)}"
     except Exception as e:
         return f"❌ Error ejecutando script: {str(e)}"
 
+def traducir_y_sintetizar(solicitud, publicar=None):
+    """Traduce (si aplica) y sintetiza en el servidor; devuelve (mensaje, clave del clip).
+
+    No pasa por el pool de procesos: la traducción es thread-safe y la síntesis
+    usa los motores TTS en hilos dedicados, así no hace cola detrás del micrófono.
+    publicar(etapa, **datos) recibe los resultados parciales.
+    """
+    publicar = publicar or (lambda etapa, **datos: None)
+    texto = solicitud.texto.strip()
+    if not texto:
+        raise ValueError("No se recibio texto")
+
+    if solicitud.tarea == "texto_a_voz":
+        mensaje = f"🔊 Texto convertido a voz: {texto}"
+        clave = sintesis_voz.sintetizar(texto, idioma="es", timeout=config.TIMEOUT_VOZ)
+    else:
+        publicar('texto', texto=texto)
+        mensaje = traduccion.traducir(texto, solicitud.idioma)
+        publicar('traduccion', texto=mensaje, idioma=solicitud.idioma)
+        clave = sintesis_voz.sintetizar(mensaje, idioma=solicitud.idioma, timeout=config.TIMEOUT_VOZ)
+
+    publicar('audio', audio=f"/audio/{clave}.wav")
+    return mensaje, clave
+
+def ejecutar_con_audio(script, argumentos=""):
+    """Responde JSON con el texto y la URL del clip para reproducir en el navegador"""
+    try:
+        solicitud = crear_solicitud(script, argumentos)
+        try:
+            mensaje, clave = traducir_y_sintetizar(solicitud)
+        except traduccion.ErrorTraduccion as e:
+            return jsonify({'status': 'error', 'mensaje': f"❌ Error: Error en traduccion: {str(e)}"})
+
+        print(f"📨 Respuesta {script}: {mensaje} ({clave[:12]})")
+        return jsonify({'status': 'ok', 'mensaje': mensaje, 'audio': f"/audio/{clave}.wav"})
+
+    except ValueError as e:
+        return jsonify({'status': 'error', 'mensaje': f"❌ Error: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'mensaje': f"❌ Error ejecutando script: {str(e)}"}), 500
+
+@app.route('/health')
+def health():
+    """Estado de los componentes; 503 si alguno falló o se está calentando"""
+    estados = estado_componentes.values()
+    if 'error' in estados:
+        status = 'error'
+    elif 'calentando' in estados:
+        status = 'calentando'
+    else:
+        status = 'ok'
+    respuesta = jsonify({
+        'status': status,
+        'uptime': round(time.time() - inicio_servidor, 1),
+        **estado_componentes
+    })
+    return respuesta, 200 if status == 'ok' else 503
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -158,12 +319,16 @@ def texto_traducido():
 
 @app.route('/lenguaje_senas')
 def lenguaje_senas():
+    # Asignar la cookie de sesión antes de que el cliente abra el WebSocket
+    get_session_id()
     return render_template('lenguaje_senas.html')
 
 @app.route('/control_carro')
 def control_carro():
     return render_template('control_carro.html')
 
+# Rutas síncronas de compatibilidad: ocupan un hilo hasta que termina la tarea.
+# Las páginas usan /trabajos (encolar + SSE) para no atar la concurrencia a su duración
 @app.route('/ejecutar_voz_a_texto')
 def ejecutar_voz_a_texto():
     respuesta = ejecutar_script_python("voz_a_texto")
@@ -173,33 +338,196 @@ def ejecutar_voz_a_texto():
 def ejecutar_texto_a_voz():
     datos = request.get_json()
     texto = datos.get('texto', '')
-    respuesta = ejecutar_script_python("texto_a_voz", texto)
-    return respuesta
+    return ejecutar_con_audio("texto_a_voz", texto)
 
 @app.route('/ejecutar_traductor_voz', methods=['POST'])
 def ejecutar_traductor_voz():
     datos = request.get_json()
     argumentos_json = json.dumps(datos)
-    respuesta = ejecutar_script_python("voz_traductor", argumentos_json)
-    return respuesta
+    return ejecutar_con_audio("voz_traductor", argumentos_json)
 
 @app.route('/ejecutar_traductor_texto', methods=['POST'])
 def ejecutar_traductor_texto():
     datos = request.get_json()
     argumentos_json = json.dumps(datos)
-    respuesta = ejecutar_script_python("texto_traducido", argumentos_json)
-    return respuesta
+    return ejecutar_con_audio("texto_traducido", argumentos_json)
+
+CLAVE_AUDIO = re.compile(r'[0-9a-f]{64}')
+
+@app.route('/audio/<clave>.wav')
+def audio(clave):
+    """Clips generados por el TTS; el nombre es el hash del contenido, así que nunca cambian"""
+    if not CLAVE_AUDIO.fullmatch(clave):
+        abort(404)
+    return send_from_directory(
+        os.path.abspath(config.AUDIO_DIR), f"{clave}.wav",
+        mimetype='audio/wav', max_age=7 * 24 * 3600
+    )
+
+# ============ TRABAJOS ASÍNCRONOS ============
+# POST /trabajos encola y responde 202 con el id; el avance se consulta en
+# /trabajos/<id> (polling) o /trabajos/<id>/eventos (SSE)
+cola_trabajos = trabajos.ColaTrabajos(
+    hilos=config.TRABAJOS_HILOS,
+    capacidad=config.TRABAJOS_CAPACIDAD,
+    retencion=config.TRABAJOS_RETENCION
+)
+
+def trabajo_voz(trabajo, solicitud):
+    """Ejecuta una SolicitudVoz publicando cada etapa: texto → traducción → audio"""
+    if solicitud.tarea == "voz_a_texto":
+        respuesta = get_pool_voz().ejecutar(solicitud)
+        if not respuesta.ok:
+            raise RuntimeError(respuesta.error)
+        trabajo.publicar('texto', texto=respuesta.texto)
+        return {'texto': respuesta.texto}
+
+    mensaje, clave = traducir_y_sintetizar(solicitud, trabajo.publicar)
+    return {'texto': mensaje, 'audio': f"/audio/{clave}.wav"}
+
+@app.route('/trabajos', methods=['POST'])
+def crear_trabajo():
+    datos = request.get_json(silent=True) or {}
+    tipo = datos.get('tipo', '')
+    try:
+        argumentos = datos.get('texto', '') if tipo == 'texto_a_voz' else json.dumps(datos)
+        solicitud = crear_solicitud(tipo, argumentos)
+        trabajo = cola_trabajos.enviar(tipo, trabajo_voz, solicitud)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'mensaje': str(e)}), 400
+    except trabajos.ColaLlena as e:
+        respuesta = jsonify({'status': 'error', 'mensaje': f'Servidor ocupado: {str(e)}'})
+        respuesta.headers['Retry-After'] = '2'
+        return respuesta, 429
+
+    return jsonify({
+        'status': 'ok',
+        'id': trabajo.id,
+        'estado': trabajo.estado,
+        'url': f'/trabajos/{trabajo.id}',
+        'eventos': f'/trabajos/{trabajo.id}/eventos'
+    }), 202
+
+@app.route('/trabajos/<id_trabajo>')
+def estado_trabajo(id_trabajo):
+    trabajo = cola_trabajos.obtener(id_trabajo)
+    if trabajo is None:
+        return jsonify({'status': 'error', 'mensaje': 'Trabajo no encontrado'}), 404
+    return jsonify(trabajo.a_dict())
+
+@app.route('/trabajos/<id_trabajo>', methods=['DELETE'])
+@app.route('/trabajos/<id_trabajo>/cancelar', methods=['POST'])
+def cancelar_trabajo(id_trabajo):
+    trabajo = cola_trabajos.cancelar(id_trabajo)
+    if trabajo is None:
+        return jsonify({'status': 'error', 'mensaje': 'Trabajo no encontrado'}), 404
+    return jsonify({'status': 'ok', 'id': trabajo.id, 'estado': trabajo.estado})
+
+@app.route('/trabajos/<id_trabajo>/eventos')
+def eventos_trabajo(id_trabajo):
+    """Server-Sent Events: un evento por etapa y uno final con el estado"""
+    trabajo = cola_trabajos.obtener(id_trabajo)
+    if trabajo is None:
+        return jsonify({'status': 'error', 'mensaje': 'Trabajo no encontrado'}), 404
+
+    def generar():
+        enviadas = 0
+        while True:
+            etapas, finalizado = trabajo.esperar(enviadas, timeout=15)
+            for etapa in etapas:
+                yield f"event: {etapa['etapa']}\ndata: {json.dumps(etapa)}\n\n"
+            enviadas += len(etapas)
+            if finalizado:
+                yield f"event: fin\ndata: {json.dumps(trabajo.a_dict())}\n\n"
+                return
+            if not etapas:
+                yield ": ping\n\n"
+
+    return Response(generar(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/metricas_trabajos')
+def metricas_trabajos():
+    return jsonify(cola_trabajos.metricas())
+
+# Dictado desde el micrófono del navegador: PCM16 mono, frecuencia en ?rate= (16000 por defecto)
+def crear_sesion_dictado():
+    """Sesión con el sample rate e idioma de la query; lanza ValueError si el rate no es válido"""
+    rate = request.args.get('rate', reconocimiento_voz.SAMPLE_RATE, type=int)
+    if rate is None or not reconocimiento_voz.SAMPLE_RATE_MIN <= rate <= reconocimiento_voz.SAMPLE_RATE_MAX:
+        raise ValueError(
+            f"rate debe estar entre {reconocimiento_voz.SAMPLE_RATE_MIN} y {reconocimiento_voz.SAMPLE_RATE_MAX}"
+        )
+    idioma = request.args.get('idioma', 'es-ES')
+    return reconocimiento_voz.SesionDictado(rate, idioma)
+
+@app.route('/reconocer_voz', methods=['POST'])
+def reconocer_voz():
+    """Audio subido por trozos; cada frase se reconoce en cuanto el VAD la cierra"""
+    try:
+        sesion = crear_sesion_dictado()
+    except ValueError as e:
+        return jsonify({'status': 'error', 'mensaje': f"❌ Error: {str(e)}"}), 400
+
+    try:
+        while True:
+            trozo = request.stream.read(16384)
+            if not trozo:
+                break
+            sesion.agregar(trozo)
+        sesion.terminar()
+
+        frases = sesion.resultados(esperar=True)
+        texto = ' '.join(frase['texto'] for frase in frases if frase['ok'])
+        if not texto:
+            error = frases[0]['error'] if frases else 'No se detecto voz.'
+            return jsonify({'status': 'error', 'mensaje': f"❌ Error: {error}", 'frases': frases})
+        return jsonify({'status': 'ok', 'texto': texto, 'frases': frases})
+    except Exception as e:
+        return jsonify({'status': 'error', 'mensaje': f"❌ Error: {str(e)}"}), 500
+
+if sock is not None:
+    @sock.route('/ws/voz')
+    def ws_voz(ws):
+        """Stream de audio por WebSocket.
+
+        Mensajes binarios: PCM16 mono. El texto 'fin' cierra la frase en curso.
+        Se responde con JSON {tipo: 'frase', ok, texto|error} por cada frase reconocida.
+        """
+        try:
+            sesion = crear_sesion_dictado()
+        except ValueError as e:
+            ws.send(json.dumps({'tipo': 'error', 'mensaje': str(e)}))
+            return
+
+        def enviar_listos(esperar=False):
+            for resultado in sesion.resultados(esperar=esperar):
+                ws.send(json.dumps({'tipo': 'frase', **resultado}))
+
+        while True:
+            # Timeout corto para entregar resultados aunque el cliente deje de enviar audio
+            mensaje = ws.receive(timeout=0.1)
+            if isinstance(mensaje, (bytes, bytearray)):
+                sesion.agregar(mensaje)
+            elif mensaje == 'fin':
+                sesion.terminar()
+                enviar_listos(esperar=True)
+                continue
+            enviar_listos()
 
 @app.route('/obtener_texto_senas')
 def obtener_texto_senas():
     """Endpoint para obtener el texto reconocido de señas"""
-    recognizer = get_sign_recognizer()
-    if recognizer is None:
+    if get_sign_sessions() is None:
         return jsonify({
             'text': 'Error: Modelos no disponibles',
             'mode': 'error',
             'confidence': 0
         })
+
+    recognizer = get_sign_recognizer()
+    if recognizer is None:
+        # Todavía no envió frames: no se crea una sesión solo para leer el texto
+        return jsonify({'text': '', 'mode': 'static', 'confidence': 0})
     
     try:
         return jsonify({
@@ -214,45 +542,58 @@ def obtener_texto_senas():
             'confidence': 0
         })
 
+# Tipos de contenido aceptados como frame binario (JPEG crudo en el cuerpo)
+FRAME_MIMETYPES = ('image/jpeg', 'image/png', 'application/octet-stream')
+
+def leer_frame_request():
+    """Obtiene los bytes del frame: cuerpo binario o, por compatibilidad, JSON con data URL base64"""
+    if request.mimetype in FRAME_MIMETYPES:
+        return request.get_data(cache=False)
+
+    import base64
+
+    data = request.get_json()
+    frame_data = data.get('frame', '')
+
+    # Decode base64 image
+    if frame_data.startswith('data:image'):
+        frame_data = frame_data.split(',')[1]
+
+    return base64.b64decode(frame_data)
+
+def respuesta_senas(result):
+    """Campos que recibe el cliente: texto, modo, confianza y el ritmo de captura sugerido"""
+    return {
+        'text': result['text'],
+        'mode': result['mode'],
+        'confidence': result['confidence'],
+        'next_interval_ms': result['next_interval_ms'],
+        'next_width': result['next_width']
+    }
+
 @app.route('/procesar_frame_senas', methods=['POST'])
 def procesar_frame_senas():
     """Endpoint para procesar frames de video en tiempo real"""
-    recognizer = get_sign_recognizer()
-    if recognizer is None:
+    pipeline = get_sign_pipeline()
+    if pipeline is None:
         return jsonify({
             'text': 'Error: Modelos no disponibles',
             'mode': 'error',
             'confidence': 0
         })
     
+    session_id = get_session_id()
     try:
-        import cv2
-        import numpy as np
-        import base64
-        
-        # Get frame from request
-        data = request.get_json()
-        frame_data = data.get('frame', '')
-        
-        # Decode base64 image
-        if frame_data.startswith('data:image'):
-            frame_data = frame_data.split(',')[1]
-        
-        img_bytes = base64.b64decode(frame_data)
-        img_array = np.frombuffer(img_bytes, dtype=np.uint8)
-        frame = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-        
         # Process frame
-        result = recognizer.process_frame(frame)
+        result = pipeline.submit(session_id, leer_frame_request())
         
-        return jsonify({
-            'text': result['text'],
-            'mode': result['mode'],
-            'confidence': result['confidence']
-        })
+        return jsonify(respuesta_senas(result))
         
     except Exception as e:
+        if sesiones_llenas(e):
+            return respuesta_sesiones_llenas(e)
         print(f"❌ Error procesando frame: {e}")
+        recognizer = get_sign_recognizer(session_id)
         return jsonify({
             'text': recognizer.get_text() if recognizer else '',
             'mode': 'error',
@@ -260,16 +601,167 @@ def procesar_frame_senas():
             'error': str(e)
         })
 
+@app.route('/procesar_landmarks_senas', methods=['POST'])
+def procesar_landmarks_senas():
+    """Landmarks calculados en el cliente (MediaPipe Hands en el navegador) en lugar de la imagen.
+
+    Cuerpo binario (application/octet-stream): ver decode_landmarks en lenguaje_senas_service.
+    """
+    pipeline = get_sign_pipeline()
+    if pipeline is None:
+        return jsonify({
+            'text': 'Error: Modelos no disponibles',
+            'mode': 'error',
+            'confidence': 0
+        })
+
+    session_id = get_session_id()
+    try:
+        result = pipeline.submit_landmarks(session_id, request.get_data(cache=False))
+        return jsonify(respuesta_senas(result))
+    except ValueError as e:
+        return jsonify({'text': '', 'mode': 'error', 'confidence': 0, 'error': str(e)}), 400
+    except Exception as e:
+        if sesiones_llenas(e):
+            return respuesta_sesiones_llenas(e)
+        print(f"❌ Error procesando landmarks: {e}")
+        recognizer = get_sign_recognizer(session_id)
+        return jsonify({
+            'text': recognizer.get_text() if recognizer else '',
+            'mode': 'error',
+            'confidence': 0,
+            'error': str(e)
+        })
+
+def cerrar_sesion_socket(session_id, sesion_del_socket):
+    """Una sesión creada solo para un WebSocket no se reutiliza: libera su tracker al cerrar"""
+    if sesion_del_socket and sign_sessions is not None:
+        sign_sessions.remove(session_id)
+
+if sock is not None:
+    @sock.route('/ws/senas')
+    def ws_senas(ws):
+        """Stream de frames por WebSocket.
+
+        Cada mensaje binario es: número de secuencia (uint32 big-endian) + JPEG.
+        Se responde con JSON {seq, text, mode, confidence}. Los frames que llegan
+        con una secuencia menor o igual a la última procesada se descartan.
+        """
+        # Mismas reglas que las rutas HTTP; sin token válido, sesión solo de este socket
+        session_id = leer_session_id()
+        sesion_del_socket = session_id is None
+        if sesion_del_socket:
+            session_id = uuid.uuid4().hex
+        last_seq = -1
+        try:
+            while True:
+                mensaje = ws.receive()
+                if mensaje is None:
+                    break
+                if not isinstance(mensaje, (bytes, bytearray)) or len(mensaje) <= 4:
+                    continue
+
+                seq = struct.unpack_from('>I', mensaje)[0]
+                if seq <= last_seq:
+                    continue
+                last_seq = seq
+
+                pipeline = get_sign_pipeline()
+                if pipeline is None:
+                    ws.send(json.dumps({'seq': seq, 'text': 'Error: Modelos no disponibles', 'mode': 'error', 'confidence': 0}))
+                    continue
+
+                try:
+                    # La secuencia del cliente solo ordena este socket; el pipeline numera por sesión
+                    result = pipeline.submit(session_id, memoryview(mensaje)[4:])
+                    ws.send(json.dumps({'seq': seq, **respuesta_senas(result)}))
+                except Exception as e:
+                    if not sesiones_llenas(e):
+                        print(f"❌ Error procesando frame (ws): {e}")
+                    recognizer = get_sign_recognizer(session_id)
+                    ws.send(json.dumps({'seq': seq, 'text': recognizer.get_text() if recognizer else '', 'mode': 'error', 'confidence': 0, 'error': str(e)}))
+        finally:
+            cerrar_sesion_socket(session_id, sesion_del_socket)
+
+    @sock.route('/ws/senas_landmarks')
+    def ws_senas_landmarks(ws):
+        """Stream de landmarks por WebSocket: cada mensaje binario es un paquete de decode_landmarks.
+
+        Se responde con JSON {t, text, mode, confidence}; t es el timestamp del
+        paquete. Los paquetes con un timestamp no más nuevo que el último se descartan
+        y se responden igual con dropped: true, para que el cliente no espere la respuesta.
+        """
+        # Mismas reglas que las rutas HTTP; sin token válido, sesión solo de este socket
+        session_id = leer_session_id()
+        sesion_del_socket = session_id is None
+        if sesion_del_socket:
+            session_id = uuid.uuid4().hex
+        try:
+            while True:
+                mensaje = ws.receive()
+                if mensaje is None:
+                    break
+                if not isinstance(mensaje, (bytes, bytearray)):
+                    continue
+
+                pipeline = get_sign_pipeline()
+                if pipeline is None:
+                    ws.send(json.dumps({'text': 'Error: Modelos no disponibles', 'mode': 'error', 'confidence': 0}))
+                    continue
+
+                timestamp = struct.unpack_from('<d', mensaje)[0] if len(mensaje) >= 8 else None
+                if timestamp is not None and not math.isfinite(timestamp):
+                    timestamp = None  # JSON no admite inf/NaN; el paquete se rechaza abajo
+                try:
+                    result = pipeline.submit_landmarks(session_id, mensaje)
+                    respuesta = {'t': timestamp, **respuesta_senas(result)}
+                    if result.get('dropped'):
+                        respuesta['dropped'] = True
+                    ws.send(json.dumps(respuesta))
+                except ValueError as e:
+                    ws.send(json.dumps({'t': timestamp, 'text': '', 'mode': 'error', 'confidence': 0, 'error': str(e)}))
+                except Exception as e:
+                    if not sesiones_llenas(e):
+                        print(f"❌ Error procesando landmarks (ws): {e}")
+                    recognizer = get_sign_recognizer(session_id)
+                    ws.send(json.dumps({'t': timestamp, 'text': recognizer.get_text() if recognizer else '', 'mode': 'error', 'confidence': 0, 'error': str(e)}))
+        finally:
+            cerrar_sesion_socket(session_id, sesion_del_socket)
+
 @app.route('/limpiar_texto_senas', methods=['POST'])
 def limpiar_texto_senas():
     """Endpoint para limpiar el texto de señas"""
+    if get_sign_sessions() is None:
+        return jsonify({'status': 'error', 'message': 'Reconocedor no disponible'})
     recognizer = get_sign_recognizer()
     if recognizer:
         recognizer.reset()
-        return jsonify({'status': 'ok', 'message': 'Texto limpiado'})
-    return jsonify({'status': 'error', 'message': 'Reconocedor no disponible'})
+    return jsonify({'status': 'ok', 'message': 'Texto limpiado'})
+
+@app.route('/metricas_senas')
+def metricas_senas():
+    """Métricas del pool de sesiones de señas"""
+    sessions = get_sign_sessions()
+    if sessions is None:
+        return jsonify({'status': 'error', 'message': 'Reconocedor no disponible'})
+    return jsonify({**sessions.metrics(), **sign_pipeline.metrics()})
 
 # ============ CONTROL DEL CARRO ============
+# Conexión MQTT persistente con el ESP32 (lazy loading)
+carro = None
+_carro_lock = threading.Lock()
+
+def get_carro():
+    global carro
+    with _carro_lock:
+        if carro is None:
+            carro = ClienteCarro(
+                config.MQTT_BROKER,
+                config.MQTT_PUERTO,
+                intervalo=config.MQTT_INTERVALO_CONTROL
+            )
+        return carro
+
 @app.route('/control_carro', methods=['POST'])
 def enviar_control_carro():
     """Endpoint para enviar comandos de control al carro"""
@@ -280,15 +772,16 @@ def enviar_control_carro():
         
         print(f"🚗 Control Carro: {direccion} @ {velocidad}%")
         
-        # Aquí iría la lógica para enviar al ESP32 vía serial
-        # Por ejemplo: serial.write(f"MOVE:{direccion}:{velocidad}\n".encode())
+        comando = get_carro().enviar_control(direccion, velocidad)
         
         return jsonify({
             'status': 'ok',
-            'mensaje': f'Comando enviado: {direccion}',
+            'mensaje': f'Comando enviado: {comando}',
             'direccion': direccion,
             'velocidad': velocidad
         })
+    except ValueError as e:
+        return jsonify({'status': 'error', 'mensaje': str(e)}), 400
     except Exception as e:
         return jsonify({'status': 'error', 'mensaje': str(e)})
 
@@ -301,7 +794,7 @@ def modo_autonomo():
         
         print(f"🤖 Modo autónomo: {'ACTIVADO' if activado else 'DESACTIVADO'}")
         
-        # Aquí iría la lógica para activar modo autónomo en el ESP32
+        get_carro().modo_autonomo(activado)
         
         return jsonify({
             'status': 'ok',
@@ -316,7 +809,7 @@ def emergencia():
     try:
         print("🚨 PARADA DE EMERGENCIA ACTIVADA")
         
-        # Aquí iría la lógica para detener el carro inmediatamente
+        get_carro().emergencia()
         
         return jsonify({
             'status': 'ok',
@@ -334,6 +827,8 @@ def actualizar_velocidad():
         
         print(f"⚡ Velocidad actualizada: {velocidad}%")
         
+        velocidad = get_carro().actualizar_velocidad(velocidad)
+        
         return jsonify({
             'status': 'ok',
             'velocidad': velocidad
@@ -343,49 +838,106 @@ def actualizar_velocidad():
 
 @app.route('/estado_carro')
 def estado_carro():
-    """Obtener estado del carro (batería, señal, etc.)"""
-    import random
-    
-    # En producción, esto vendría del ESP32
+    """Último estado reportado por el ESP32 en looky/status"""
+    carro = get_carro()
     return jsonify({
-        'bateria': random.randint(70, 95),
-        'senal': random.choice(['Excelente', 'Buena', 'Regular']),
-        'temperatura': random.randint(20, 35),
-        'estado': 'activo'
+        **carro.telemetria.instantanea(),
+        'mqtt': carro.metricas()
     })
 
+@app.route('/eventos_carro')
+def eventos_carro():
+    """Server-Sent Events con la telemetría del carro.
+
+    Al conectarse se envía el estado actual y los eventos recientes del historial
+    (o solo los posteriores a Last-Event-ID al reconectar); luego cada evento nuevo.
+    """
+    telemetria = get_carro().telemetria
+    ultimo = request.headers.get('Last-Event-ID', type=int)
+
+    def generar():
+        seq = ultimo or 0
+        if ultimo is None:
+            estado = telemetria.instantanea()
+            seq = estado['seq']
+            yield f"event: estado\ndata: {json.dumps(estado)}\n\n"
+            eventos = telemetria.eventos_desde(0)
+        else:
+            eventos = telemetria.eventos_desde(seq)
+
+        while True:
+            for evento in eventos:
+                yield f"id: {evento['seq']}\nevent: telemetria\ndata: {json.dumps(evento)}\n\n"
+                seq = max(seq, evento['seq'])
+            if not eventos:
+                yield ": ping\n\n"
+            eventos = telemetria.esperar(seq, timeout=15)
+
+    return Response(generar(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/metricas_carro')
+def metricas_carro():
+    return jsonify({
+        'mqtt': get_carro().metricas(),
+        'latencias': {nombre: histograma.a_dict() for nombre, histograma in mqtt_carro.latencias.items()}
+    })
+
+if sock is not None:
+    @sock.route('/ws/carro')
+    def ws_carro(ws):
+        """Canal de manejo: comandos JSON con seq y hora del cliente, latido en ambos sentidos"""
+        canal = mqtt_carro.CanalControl(
+            get_carro(),
+            plazo_ms=config.CARRO_PLAZO_MS,
+            latido=config.CARRO_LATIDO,
+            latido_perdido=config.CARRO_LATIDO_PERDIDO
+        )
+        try:
+            while True:
+                # Timeout corto: el latido y la parada por silencio no dependen de que llegue algo
+                mensaje = ws.receive(timeout=0.1)
+                respuestas = []
+                if mensaje is not None:
+                    try:
+                        respuestas = canal.recibir(json.loads(mensaje))
+                    except (ValueError, TypeError, AttributeError) as e:
+                        respuestas = [{'tipo': 'error', 'mensaje': f'Mensaje inválido: {e}'}]
+                respuestas += canal.revisar()
+                for respuesta in respuestas:
+                    ws.send(json.dumps(respuesta))
+        finally:
+            canal.cerrar()
+
 if __name__ == '__main__':
-    import os
-    
-    print("🚀 Iniciando servidor web Look-y...")
-    
-    # Detectar si tenemos pyOpenSSL/cryptography para SSL
-    ssl_available = False
-    try:
-        import OpenSSL
-        import cryptography
-        ssl_available = True
-    except ImportError:
-        pass
+    # Modo desarrollo. En producción: gunicorn -c gunicorn.conf.py wsgi:app
+    import certificados
+
+    print("🚀 Iniciando servidor web Look-y (desarrollo)...")
+
+    # Con el reloader el script corre dos veces; calentar solo en el proceso que sirve
+    if not config.RECARGAR or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        iniciar_calentamiento()
+
+    opciones = {'host': config.HOST, 'port': config.PUERTO, 'debug': config.DEBUG, 'use_reloader': config.RECARGAR}
+    ssl_context = certificados.asegurar(config.CERT_ARCHIVO, config.CLAVE_ARCHIVO) if config.HTTPS else None
     
     # Intentar usar SSL si está disponible
-    if ssl_available:
+    if ssl_context:
         try:
             print("🔒 Iniciando con HTTPS...")
-            print("🌐 Servidor corriendo en: https://localhost:5000")
-            print("📱 Desde tu teléfono: https://[IP_DE_TU_PC]:5000")
-            print("💡 Acepta el certificado autofirmado cuando lo pida\n")
-            app.run(host='0.0.0.0', port=5000, ssl_context='adhoc', debug=True)
+            print(f"🌐 Servidor corriendo en: https://localhost:{config.PUERTO}")
+            print(f"📱 Desde tu teléfono: https://[IP_DE_TU_PC]:{config.PUERTO}")
+            print("💡 Acepta el certificado autofirmado la primera vez (se guarda en certs/)\n")
+            app.run(ssl_context=ssl_context, **opciones)
         except Exception as e:
             print(f"⚠️  No se pudo iniciar HTTPS: {e}")
             print("🌐 Iniciando con HTTP normal...\n")
-            print("🌐 Servidor corriendo en: http://localhost:5000")
-            print("📱 Desde tu teléfono: http://[IP_DE_TU_PC]:5000")
+            print(f"🌐 Servidor corriendo en: http://localhost:{config.PUERTO}")
+            print(f"📱 Desde tu teléfono: http://[IP_DE_TU_PC]:{config.PUERTO}")
             print("⚠️  Para permisos de cámara/micrófono usa localhost\n")
-            app.run(host='0.0.0.0', port=5000, debug=True)
+            app.run(**opciones)
     else:
-        print("🌐 Servidor corriendo en: http://localhost:5000")
-        print("📱 Desde tu teléfono: http://[IP_DE_TU_PC]:5000")
-        print("💡 Para HTTPS instala: pip install pyopenssl cryptography")
+        print(f"🌐 Servidor corriendo en: http://localhost:{config.PUERTO}")
+        print(f"📱 Desde tu teléfono: http://[IP_DE_TU_PC]:{config.PUERTO}")
         print("⚠️  Para permisos de cámara/micrófono usa localhost\n")
-        app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+        app.run(**opciones)
\ No newline at end of file
@@ -0,0 +1,303 @@
+"""
+Síntesis de voz a archivo con caché por contenido
+El audio se genera una sola vez con pyttsx3.save_to_file y el navegador lo reproduce;
+el servidor nunca bloquea esperando a sus propios parlantes.
+
+Los motores pyttsx3 no son thread-safe: cada uno vive en su propio hilo y
+recibe trabajos por una cola compartida (PoolMotores). Las voces instaladas
+se indexan por código de idioma una sola vez por proceso.
+"""
+
+import hashlib
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import Future
+
+import config
+
+RATE = 170
+VOLUMEN = 0.8
+
+
+def clave_audio(texto, voz=None, rate=RATE, volumen=VOLUMEN):
+    """Hash del contenido: el mismo texto con la misma voz siempre da el mismo archivo"""
+    contenido = "\0".join((texto, voz or "", str(rate), str(volumen)))
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+class CacheAudio:
+    """Directorio de clips <clave>.wav con desalojo de los menos usados al superar max_bytes.
+
+    El tamaño total se lleva en memoria y el directorio solo se recorre al
+    superar el límite o cada RECUENTO clips guardados (otros workers también escriben).
+    """
+
+    RECUENTO = 64
+    # Al desalojar se baja hasta esta fracción del límite para no recorrer en cada clip
+    OBJETIVO = 0.9
+
+    def __init__(self, directorio, max_bytes):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total = None  # bytes en clips; None = sin recorrer todavía
+        self._sin_recuento = 0
+
+    def ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.wav")
+
+    def ruta_temporal(self, clave):
+        """Archivo donde el motor escribe el clip antes de publicarlo con guardar()"""
+        os.makedirs(self.directorio, exist_ok=True)
+        return os.path.join(self.directorio, f".{clave}.{os.getpid()}.{threading.get_ident()}.tmp.wav")
+
+    def obtener(self, clave):
+        ruta = self.ruta(clave)
+        try:
+            # El mtime marca el último uso para el desalojo
+            os.utime(ruta)
+            return ruta
+        except OSError:
+            return None
+
+    def guardar(self, clave, ruta_temporal):
+        ruta = self.ruta(clave)
+        tamano = os.path.getsize(ruta_temporal)
+        try:
+            anterior = os.path.getsize(ruta)
+        except OSError:
+            anterior = 0
+        os.replace(ruta_temporal, ruta)
+
+        with self._lock:
+            self._sin_recuento += 1
+            if self._total is None or self._sin_recuento >= self.RECUENTO:
+                self._total = self._recorrer()[1]
+                self._sin_recuento = 0
+            else:
+                self._total += tamano - anterior
+            if self._total > self.max_bytes:
+                self._desalojar()
+        return ruta
+
+    def _recorrer(self):
+        """Clips publicados (mtime, tamaño, ruta) y su total; ignora los temporales a medio escribir"""
+        archivos = []
+        total = 0
+        for entrada in os.scandir(self.directorio):
+            if entrada.name.startswith(".") or not entrada.name.endswith(".wav"):
+                continue
+            try:
+                if not entrada.is_file():
+                    continue
+                info = entrada.stat()
+            except OSError:
+                continue  # lo borró otro worker
+            archivos.append((info.st_mtime, info.st_size, entrada.path))
+            total += info.st_size
+        return archivos, total
+
+    def _desalojar(self):
+        """Borra los clips menos usados hasta bajar a OBJETIVO × max_bytes (con el lock tomado)"""
+        archivos, total = self._recorrer()
+        archivos.sort()
+        for _, tamano, ruta in archivos:
+            if total <= self.max_bytes * self.OBJETIVO:
+                break
+            try:
+                os.remove(ruta)
+                total -= tamano
+            except OSError:
+                pass
+        self._total = total
+        self._sin_recuento = 0
+
+
+cache = CacheAudio(config.AUDIO_DIR, config.AUDIO_MAX_MB * 1024 * 1024)
+
+
+# ====================================
+#   Índice de voces por idioma
+# ====================================
+
+# Palabras en el nombre de la voz cuando el driver no informa el idioma (SAPI5)
+NOMBRES_IDIOMA = {
+    "es": ("spanish", "español", "espanol", "helena", "sabina", "laura"),
+    "en": ("english", "david", "zira", "mark"),
+    "fr": ("french", "français", "hortense"),
+    "de": ("german", "deutsch", "hedda"),
+    "it": ("italian", "italiano", "elsa"),
+    "ja": ("japanese", "haruka", "ayumi"),
+}
+
+_indice_voces = None
+_indice_lock = threading.Lock()
+
+
+def _codigo_idioma(idioma):
+    """'es_ES', 'es-419' o b'\\x05es' (espeak) → 'es'"""
+    if isinstance(idioma, bytes):
+        idioma = idioma.decode("utf-8", errors="ignore")
+    idioma = "".join(c for c in str(idioma) if c.isprintable()).strip().lower()
+    return idioma.replace("-", "_").split("_")[0]
+
+
+def indexar_voces(motor):
+    """Recorre las voces del motor una vez: {codigo_idioma: [ids de voz]}"""
+    indice = {}
+    for voz in motor.getProperty('voices'):
+        codigos = {_codigo_idioma(idioma) for idioma in voz.languages or []}
+        nombre = (voz.name or "").lower()
+        codigos |= {codigo for codigo, palabras in NOMBRES_IDIOMA.items() if any(p in nombre for p in palabras)}
+        for codigo in codigos:
+            if codigo:
+                indice.setdefault(codigo, []).append(voz.id)
+    return indice
+
+
+def indice_voces(motor):
+    global _indice_voces
+    with _indice_lock:
+        if _indice_voces is None:
+            _indice_voces = indexar_voces(motor)
+            print(f"🔧 Voces TTS por idioma: { {codigo: len(ids) for codigo, ids in _indice_voces.items()} }")
+        return _indice_voces
+
+
+def _primera_voz(indice, idioma):
+    voces = indice.get(_codigo_idioma(idioma)) if idioma else None
+    return voces[0] if voces else None
+
+
+def voz_para_idioma(motor, idioma):
+    """Primera voz instalada para el idioma ('en', 'es-ES', ...), None si no hay"""
+    return _primera_voz(indice_voces(motor), idioma)
+
+
+# ====================================
+#   Motores en hilos dedicados
+# ====================================
+
+def _crear_motor():
+    if sys.platform == "win32":
+        # SAPI5 usa COM: cada hilo debe inicializarlo
+        import comtypes
+        comtypes.CoInitialize()
+
+    import pyttsx3
+    # Engine() directo: pyttsx3.init() devolvería siempre la misma instancia
+    return pyttsx3.Engine()
+
+
+class MotorTTS(threading.Thread):
+    """Hilo dueño de un motor pyttsx3; ejecuta los trabajos de la cola compartida"""
+
+    def __init__(self, trabajos, listo):
+        super().__init__(name="motor-tts", daemon=True)
+        self.trabajos = trabajos
+        self.listo = listo
+        self.motor = None
+        self.error = None
+
+    def run(self):
+        try:
+            self.motor = _crear_motor()
+            self.voz_defecto = self.motor.getProperty('voice')
+            indice_voces(self.motor)
+        except Exception as e:
+            self.error = e
+            print(f"⚠️ Motor TTS no disponible: {e}")
+        finally:
+            self.listo.release()
+
+        while True:
+            funcion, futuro = self.trabajos.get()
+            if not futuro.set_running_or_notify_cancel():
+                continue
+            if self.motor is None:
+                futuro.set_exception(RuntimeError(f"Motor TTS no disponible: {self.error}"))
+                continue
+            try:
+                futuro.set_result(funcion(self))
+            except Exception as e:
+                futuro.set_exception(e)
+
+
+class PoolMotores:
+    def __init__(self, tamano):
+        self.tamano = tamano
+        self._trabajos = queue.Queue()
+        self._listos = threading.Semaphore(0)
+        self.motores = [MotorTTS(self._trabajos, self._listos) for _ in range(tamano)]
+        for motor in self.motores:
+            motor.start()
+
+    def calentar(self):
+        """Espera a que todos los motores estén creados"""
+        for _ in self.motores:
+            self._listos.acquire()
+        for _ in self.motores:
+            self._listos.release()
+        disponibles = sum(motor.motor is not None for motor in self.motores)
+        print(f"✅ Motores TTS listos ({disponibles}/{self.tamano})")
+
+    def ejecutar(self, funcion):
+        """Corre funcion(motor_tts) en el hilo de algún motor libre; devuelve un Future"""
+        futuro = Future()
+        self._trabajos.put((funcion, futuro))
+        return futuro
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def obtener_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PoolMotores(config.MOTORES_TTS)
+        return _pool
+
+
+# ====================================
+#   Síntesis
+# ====================================
+
+def _renderizar(motor, texto, voz, rate, volumen, temporal):
+    motor.setProperty('voice', voz)
+    motor.setProperty('rate', rate)
+    motor.setProperty('volume', volumen)
+    motor.save_to_file(texto, temporal)
+    motor.runAndWait()
+
+
+def sintetizar(texto, idioma=None, voz=None, rate=RATE, volumen=VOLUMEN, timeout=None):
+    """Devuelve la clave del clip; solo usa un motor si el audio no está en caché.
+
+    Sin voz explícita se elige una del idioma indicado (o la voz por defecto).
+    """
+    pool = obtener_pool()
+
+    def trabajo(motor_tts):
+        motor = motor_tts.motor
+        elegida = voz or voz_para_idioma(motor, idioma) or motor_tts.voz_defecto
+        clave = clave_audio(texto, elegida, rate, volumen)
+        if cache.obtener(clave):
+            return clave
+
+        temporal = cache.ruta_temporal(clave)
+        _renderizar(motor, texto, elegida, rate, volumen, temporal)
+        if not os.path.exists(temporal) or os.path.getsize(temporal) == 0:
+            raise RuntimeError("El motor de voz no generó audio")
+        cache.guardar(clave, temporal)
+        return clave
+
+    # Con la voz ya resuelta, un acierto de caché no necesita pasar por un motor
+    elegida = voz or (_primera_voz(_indice_voces, idioma) if _indice_voces is not None else None)
+    if elegida and cache.obtener(clave_audio(texto, elegida, rate, volumen)):
+        return clave_audio(texto, elegida, rate, volumen)
+
+    return pool.ejecutar(trabajo).result(timeout=timeout)
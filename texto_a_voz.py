@@ -2,9 +2,17 @@ import pyttsx3
 import sys
 import io
 
-# Fix encoding for Windows console
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+from sintesis_voz import voz_para_idioma
+
+def configurar_consola():
+    # Fix encoding for Windows console
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+def buscar_voz_espanol(engine):
+    """Id de una voz en español (o una en inglés como respaldo), None si no hay"""
+    # Las voces se indexan una sola vez por proceso
+    return voz_para_idioma(engine, 'es') or voz_para_idioma(engine, 'en')
 
 def hablar(texto):
     try:
@@ -15,15 +23,7 @@ def hablar(texto):
         engine.setProperty('volume', 0.8)  # Volumen
         
         # Buscar voces en español
-        voces = engine.getProperty('voices')
-        voz_espanol = None
-        
-        for voz in voces:
-            if 'spanish' in voz.name.lower() or 'espanol' in voz.name.lower():
-                voz_espanol = voz.id
-                break
-            elif 'microsoft david' in voz.name.lower() or 'microsoft zira' in voz.name.lower():
-                voz_espanol = voz.id
+        voz_espanol = buscar_voz_espanol(engine)
         
         if voz_espanol:
             engine.setProperty('voice', voz_espanol)
@@ -52,4 +52,5 @@ def main():
     print(resultado)
 
 if __name__ == "__main__":
+    configurar_consola()
     main()
\ No newline at end of file
@@ -1,17 +1,16 @@
-from googletrans import Translator
+from traduccion import traducir
 import pyttsx3
 import sys
 import io
 
-# Fix encoding for Windows console
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+def configurar_consola():
+    # Fix encoding for Windows console
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
 def traducir_texto(texto, idioma_destino):
     try:
-        traductor = Translator()
-        traduccion = traductor.translate(texto, dest=idioma_destino)
-        return traduccion.text
+        return traducir(texto, idioma_destino)
     except Exception as e:
         return f"ERROR: Error en traduccion: {str(e)}"
 
@@ -70,4 +69,5 @@ def main():
             hablar_texto(traduccion)
 
 if __name__ == "__main__":
+    configurar_consola()
     main()
\ No newline at end of file
@@ -0,0 +1,160 @@
+"""
+Trabajos asíncronos para las tareas largas de voz y traducción
+La petición HTTP solo encola y devuelve un id; el cliente sigue el avance por
+polling o Server-Sent Events. La cola es acotada: si está llena se rechaza
+(429) en lugar de acumular peticiones que ya no se atenderán a tiempo.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+EN_COLA = "en_cola"
+EJECUTANDO = "ejecutando"
+COMPLETADO = "completado"
+ERROR = "error"
+CANCELADO = "cancelado"
+
+FINALES = (COMPLETADO, ERROR, CANCELADO)
+
+
+class ColaLlena(Exception):
+    pass
+
+
+class TrabajoCancelado(Exception):
+    pass
+
+
+class Trabajo:
+    def __init__(self, tipo):
+        self.id = uuid.uuid4().hex
+        self.tipo = tipo
+        self.estado = EN_COLA
+        self.etapas = []  # resultados parciales en orden: {'etapa': ..., **datos}
+        self.resultado = None
+        self.error = None
+        self.creado = time.time()
+        self.terminado = None
+        self.futuro = None
+        self._cancelar = threading.Event()
+        self._cambio = threading.Condition()
+
+    @property
+    def finalizado(self):
+        return self.estado in FINALES
+
+    def _notificar(self, **cambios):
+        with self._cambio:
+            for campo, valor in cambios.items():
+                setattr(self, campo, valor)
+            if self.finalizado and self.terminado is None:
+                self.terminado = time.time()
+            self._cambio.notify_all()
+
+    def publicar(self, etapa, **datos):
+        """Resultado parcial (texto reconocido, traducción, audio listo...)"""
+        self.comprobar_cancelado()
+        with self._cambio:
+            self.etapas.append({'etapa': etapa, **datos})
+            self._cambio.notify_all()
+
+    def comprobar_cancelado(self):
+        """Las funciones de trabajo lo llaman entre etapas para detenerse a tiempo"""
+        if self._cancelar.is_set():
+            raise TrabajoCancelado()
+
+    def esperar(self, desde, timeout):
+        """Etapas nuevas a partir del índice `desde`; bloquea hasta que haya cambios o pase el timeout"""
+        with self._cambio:
+            self._cambio.wait_for(lambda: len(self.etapas) > desde or self.finalizado, timeout)
+            return self.etapas[desde:], self.finalizado
+
+    def a_dict(self):
+        with self._cambio:
+            return {
+                'id': self.id,
+                'tipo': self.tipo,
+                'estado': self.estado,
+                'etapas': list(self.etapas),
+                'resultado': self.resultado,
+                'error': self.error,
+                'creado': self.creado,
+                'terminado': self.terminado,
+            }
+
+
+class ColaTrabajos:
+    """Pool de hilos con límite de trabajos pendientes y retención de los terminados"""
+
+    def __init__(self, hilos=4, capacidad=32, retencion=300):
+        self.capacidad = capacidad
+        self.retencion = retencion
+        self._executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="trabajo")
+        self._trabajos = {}
+        self._lock = threading.Lock()
+        self.rechazados = 0
+
+    def _activos(self):
+        return sum(not trabajo.finalizado for trabajo in self._trabajos.values())
+
+    def _purgar(self):
+        limite = time.time() - self.retencion
+        for id_trabajo in [t.id for t in self._trabajos.values() if t.finalizado and t.terminado < limite]:
+            del self._trabajos[id_trabajo]
+
+    def enviar(self, tipo, funcion, *args):
+        """Encola funcion(trabajo, *args); lanza ColaLlena si no hay lugar"""
+        with self._lock:
+            self._purgar()
+            if self._activos() >= self.capacidad:
+                self.rechazados += 1
+                raise ColaLlena(f"Hay {self.capacidad} trabajos pendientes")
+            trabajo = Trabajo(tipo)
+            self._trabajos[trabajo.id] = trabajo
+
+        trabajo.futuro = self._executor.submit(self._ejecutar, trabajo, funcion, args)
+        return trabajo
+
+    def _ejecutar(self, trabajo, funcion, args):
+        # Cancelado antes de empezar pero después de que futuro.cancel() ya no pudiera
+        # evitarlo (el hilo lo tomó o enviar() aún no había asignado el futuro)
+        if trabajo._cancelar.is_set():
+            trabajo._notificar(estado=CANCELADO)
+            return
+        trabajo._notificar(estado=EJECUTANDO)
+        try:
+            resultado = funcion(trabajo, *args)
+            trabajo.comprobar_cancelado()
+            trabajo._notificar(estado=COMPLETADO, resultado=resultado)
+        except TrabajoCancelado:
+            trabajo._notificar(estado=CANCELADO)
+        except Exception as e:
+            trabajo._notificar(estado=ERROR, error=str(e))
+
+    def obtener(self, id_trabajo):
+        with self._lock:
+            return self._trabajos.get(id_trabajo)
+
+    def cancelar(self, id_trabajo):
+        """Cancela un trabajo en cola de inmediato; uno en ejecución se detiene en su próxima etapa"""
+        trabajo = self.obtener(id_trabajo)
+        if trabajo is None or trabajo.finalizado:
+            return trabajo
+        trabajo._cancelar.set()
+        if trabajo.futuro is not None and trabajo.futuro.cancel():
+            trabajo._notificar(estado=CANCELADO)
+        return trabajo
+
+    def metricas(self):
+        with self._lock:
+            estados = {}
+            for trabajo in self._trabajos.values():
+                estados[trabajo.estado] = estados.get(trabajo.estado, 0) + 1
+            return {
+                'capacidad': self.capacidad,
+                'activos': self._activos(),
+                'rechazados': self.rechazados,
+                'estados': estados,
+            }
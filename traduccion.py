@@ -0,0 +1,358 @@
+"""
+Traducción con caché y proveedores intercambiables
+Nivel en memoria (LRU) + nivel persistente opcional en SQLite, ambos con TTL.
+Las frases repetidas ("hola", "gracias", textos fijos de la interfaz) no vuelven a ir a la red.
+Proveedores: google (googletrans) o local (diccionario sin red, para pruebas).
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import config
+
+
+def normalizar(texto):
+    """Clave de caché: sin espacios sobrantes y sin distinguir mayúsculas"""
+    return " ".join(texto.split()).casefold()
+
+
+class CacheTraduccion:
+    def __init__(self, capacidad=1024, ttl=7 * 24 * 3600, ruta_db=None):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self._memoria = OrderedDict()  # (texto, idioma) -> (traduccion, creado)
+        self._lock = threading.Lock()
+        # El disco tiene su propio lock: un acierto en memoria no espera a un commit de SQLite
+        self._db_lock = threading.Lock()
+
+        self.aciertos_memoria = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+
+        self.ruta_db = ruta_db
+        self._db = None
+        self._db_pid = None
+
+    def _conexion(self):
+        """Conexión SQLite del proceso actual (se llama con _db_lock tomado).
+
+        Se abre en el primer uso y no al importar: una conexión heredada por fork
+        (gunicorn con preload_app) no se puede usar en el hijo.
+        """
+        if not self.ruta_db:
+            return None
+        if self._db_pid == os.getpid():
+            return self._db
+
+        self._db_pid = os.getpid()
+        try:
+            # Varios workers pueden compartir el archivo: WAL + espera en bloqueos
+            self._db = sqlite3.connect(self.ruta_db, timeout=5, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS traducciones ("
+                "texto TEXT NOT NULL, idioma TEXT NOT NULL, traduccion TEXT NOT NULL, "
+                "creado REAL NOT NULL, PRIMARY KEY (texto, idioma))"
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Caché de traducción sin disco: {e}")
+            self._db = None
+        return self._db
+
+    def _vigente(self, creado, ahora):
+        return ahora - creado < self.ttl
+
+    def obtener(self, texto, idioma):
+        clave = (normalizar(texto), idioma)
+        ahora = time.time()
+
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                if self._vigente(entrada[1], ahora):
+                    self._memoria.move_to_end(clave)
+                    self.aciertos_memoria += 1
+                    return entrada[0]
+                del self._memoria[clave]
+
+        fila = None
+        with self._db_lock:
+            db = self._conexion()
+            if db is not None:
+                try:
+                    fila = db.execute(
+                        "SELECT traduccion, creado FROM traducciones WHERE texto = ? AND idioma = ?",
+                        clave
+                    ).fetchone()
+                except sqlite3.Error:
+                    fila = None
+
+        with self._lock:
+            if fila is not None and self._vigente(fila[1], ahora):
+                # Sin pisar una traducción guardada en memoria mientras se leía el disco
+                if clave not in self._memoria:
+                    self._guardar_memoria(clave, fila[0], fila[1])
+                self.aciertos_disco += 1
+                return fila[0]
+
+            self.fallos += 1
+            return None
+
+    def guardar(self, texto, idioma, traduccion):
+        clave = (normalizar(texto), idioma)
+        ahora = time.time()
+
+        with self._lock:
+            self._guardar_memoria(clave, traduccion, ahora)
+
+        with self._db_lock:
+            db = self._conexion()
+            if db is not None:
+                try:
+                    db.execute(
+                        "INSERT OR REPLACE INTO traducciones (texto, idioma, traduccion, creado) VALUES (?, ?, ?, ?)",
+                        (*clave, traduccion, ahora)
+                    )
+                    db.commit()
+                except sqlite3.Error as e:
+                    print(f"⚠️ No se pudo guardar traducción en disco: {e}")
+
+    def _guardar_memoria(self, clave, traduccion, creado):
+        self._memoria[clave] = (traduccion, creado)
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.capacidad:
+            self._memoria.popitem(last=False)
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos_memoria + self.aciertos_disco + self.fallos
+            return {
+                "entradas_memoria": len(self._memoria),
+                "aciertos_memoria": self.aciertos_memoria,
+                "aciertos_disco": self.aciertos_disco,
+                "fallos": self.fallos,
+                "tasa_aciertos": (consultas - self.fallos) / consultas if consultas else 0.0,
+            }
+
+
+# ====================================
+#   Proveedores
+# ====================================
+
+class ErrorTraduccion(Exception):
+    pass
+
+
+class ProveedorTraduccion:
+    """Interfaz de un servicio de traducción"""
+
+    nombre = "base"
+
+    def traducir(self, texto, idioma_destino):
+        raise NotImplementedError
+
+
+_local = threading.local()
+
+
+def obtener_traductor(timeout=None):
+    """Un googletrans.Translator por hilo, reutilizado entre llamadas (mantiene la conexión HTTP)"""
+    traductor = getattr(_local, "traductor", None)
+    if traductor is None:
+        from googletrans import Translator
+        traductor = Translator(timeout=timeout) if timeout else Translator()
+        _local.traductor = traductor
+    return traductor
+
+
+class ProveedorGoogle(ProveedorTraduccion):
+    nombre = "google"
+
+    def __init__(self, timeout=5):
+        self.timeout = timeout
+
+    def traducir(self, texto, idioma_destino):
+        return obtener_traductor(self.timeout).translate(texto, dest=idioma_destino).text
+
+
+class ProveedorLocal(ProveedorTraduccion):
+    """Diccionario determinista para uso sin red y pruebas.
+
+    Traduce frases conocidas completas y, si no, palabra por palabra;
+    las palabras desconocidas se devuelven sin cambios.
+    """
+
+    nombre = "local"
+
+    DICCIONARIO = {
+        "en": {"hola": "hello", "gracias": "thank you", "adiós": "goodbye", "sí": "yes", "no": "no",
+               "por favor": "please", "buenos días": "good morning", "ayuda": "help", "agua": "water",
+               "baño": "bathroom", "cómo estás": "how are you"},
+        "fr": {"hola": "bonjour", "gracias": "merci", "adiós": "au revoir", "sí": "oui", "no": "non",
+               "por favor": "s'il vous plaît", "buenos días": "bonjour", "ayuda": "aide", "agua": "eau"},
+        "de": {"hola": "hallo", "gracias": "danke", "adiós": "auf wiedersehen", "sí": "ja", "no": "nein",
+               "por favor": "bitte", "buenos días": "guten morgen", "ayuda": "hilfe", "agua": "wasser"},
+        "it": {"hola": "ciao", "gracias": "grazie", "adiós": "arrivederci", "sí": "sì", "no": "no",
+               "por favor": "per favore", "buenos días": "buongiorno", "ayuda": "aiuto", "agua": "acqua"},
+        "ja": {"hola": "こんにちは", "gracias": "ありがとう", "adiós": "さようなら", "sí": "はい", "no": "いいえ",
+               "por favor": "お願いします", "buenos días": "おはよう", "ayuda": "助けて", "agua": "水"},
+    }
+
+    def traducir(self, texto, idioma_destino):
+        diccionario = self.DICCIONARIO.get(idioma_destino, {})
+        frase = normalizar(texto).strip(".,;:!?¡¿")
+        if frase in diccionario:
+            return diccionario[frase]
+        return " ".join(diccionario.get(normalizar(palabra).strip(".,;:!?¡¿"), palabra) for palabra in texto.split())
+
+
+PROVEEDORES = {
+    "google": ProveedorGoogle,
+    "local": ProveedorLocal,
+}
+
+
+# ====================================
+#   Traductor con caché, concurrencia y reintentos
+# ====================================
+
+_FIN_ORACION = re.compile(r"(?<=[.!?…])\s+")
+
+
+def dividir_oraciones(texto):
+    return [oracion for oracion in _FIN_ORACION.split(texto.strip()) if oracion]
+
+
+class Traductor:
+    """Traduce con caché delante del proveedor.
+
+    Las llamadas al proveedor corren en un pool acotado (max_en_vuelo), cada
+    intento tiene timeout y se reintenta con espera exponencial. Así una caída
+    del servicio remoto falla en segundos en lugar de bloquear al worker.
+
+    Una llamada que ya empezó no se puede cancelar: tras el timeout sigue
+    ocupando su hilo hasta que el proveedor responda. Mientras esas llamadas
+    colgadas llenan el pool no se reintenta ni se encola nada más (se falla
+    de inmediato), para no sumar trabajo detrás de un servicio que no responde.
+    """
+
+    def __init__(self, proveedor, cache, max_en_vuelo=4, timeout=5, reintentos=1):
+        self.proveedor = proveedor
+        self.cache = cache
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.max_en_vuelo = max_en_vuelo
+        self._executor = ThreadPoolExecutor(max_workers=max_en_vuelo, thread_name_prefix="traduccion")
+        self._colgadas = set()  # futuros que superaron el timeout y siguen corriendo
+        self._lock = threading.Lock()
+
+    def _abandonar(self, futuro):
+        """Descarta una llamada vencida; si ya corre queda contada hasta que termine"""
+        if futuro.cancel():
+            return
+        with self._lock:
+            self._colgadas.add(futuro)
+        # Si ya terminó el callback corre en el acto y no queda contada
+        futuro.add_done_callback(self._liberar)
+
+    def _liberar(self, futuro):
+        with self._lock:
+            self._colgadas.discard(futuro)
+
+    def _saturado(self):
+        with self._lock:
+            return len(self._colgadas) >= self.max_en_vuelo
+
+    def _llamar_varios(self, textos, idioma_destino):
+        """Pide al proveedor todos los textos a la vez; los que fallan se reintentan juntos"""
+        resultados = {}
+        errores = {}
+        pendientes = list(range(len(textos)))
+
+        for intento in range(self.reintentos + 1):
+            if self._saturado():
+                if intento:
+                    break
+                raise ErrorTraduccion(f"{self.proveedor.nombre} no responde: {self.max_en_vuelo} llamadas siguen en curso")
+            if intento:
+                time.sleep(0.2 * 2 ** (intento - 1))
+
+            futuros = {i: self._executor.submit(self.proveedor.traducir, textos[i], idioma_destino) for i in pendientes}
+            limite = time.monotonic() + self.timeout
+            for i, futuro in futuros.items():
+                try:
+                    resultados[i] = futuro.result(timeout=max(0, limite - time.monotonic()))
+                except TimeoutError:
+                    self._abandonar(futuro)
+                    errores[i] = f"timeout de {self.timeout}s en {self.proveedor.nombre}"
+                except Exception as e:
+                    errores[i] = str(e)
+
+            pendientes = [i for i in pendientes if i not in resultados]
+            if not pendientes:
+                return [resultados[i] for i in range(len(textos))]
+
+        raise ErrorTraduccion(errores[pendientes[0]])
+
+    def traducir(self, texto, idioma_destino):
+        """Traduce un texto; si tiene varias oraciones se traducen en paralelo"""
+        oraciones = dividir_oraciones(texto)
+        if len(oraciones) > 1:
+            return " ".join(self.traducir_varios(oraciones, idioma_destino))
+        return self.traducir_varios([texto], idioma_destino)[0]
+
+    def traducir_varios(self, textos, idioma_destino):
+        """Traduce una lista: los aciertos salen de la caché y el resto se pide en paralelo"""
+        resultados = [self.cache.obtener(texto, idioma_destino) for texto in textos]
+        pendientes = [i for i, resultado in enumerate(resultados) if resultado is None]
+
+        if pendientes:
+            traducciones = self._llamar_varios([textos[i] for i in pendientes], idioma_destino)
+            for i, traduccion in zip(pendientes, traducciones):
+                self.cache.guardar(textos[i], idioma_destino, traduccion)
+                resultados[i] = traduccion
+
+        return resultados
+
+
+cache = CacheTraduccion(
+    capacidad=config.CACHE_TRADUCCION_CAPACIDAD,
+    ttl=config.CACHE_TRADUCCION_TTL,
+    ruta_db=config.CACHE_TRADUCCION_DB or None,
+)
+
+_traductor = None
+_traductor_lock = threading.Lock()
+
+
+def obtener_traductor_servicio():
+    """Traductor del proceso con el proveedor configurado"""
+    global _traductor
+    with _traductor_lock:
+        if _traductor is None:
+            proveedor_clase = PROVEEDORES.get(config.TRADUCCION_PROVEEDOR, ProveedorGoogle)
+            proveedor = proveedor_clase() if proveedor_clase is ProveedorLocal else proveedor_clase(config.TRADUCCION_TIMEOUT)
+            _traductor = Traductor(
+                proveedor,
+                cache,
+                max_en_vuelo=config.TRADUCCION_MAX_EN_VUELO,
+                timeout=config.TRADUCCION_TIMEOUT,
+                reintentos=config.TRADUCCION_REINTENTOS,
+            )
+        return _traductor
+
+
+def traducir(texto, idioma_destino):
+    """Traduce usando la caché; lanza ErrorTraduccion si el proveedor falla"""
+    return obtener_traductor_servicio().traducir(texto, idioma_destino)
+
+
+def traducir_varios(textos, idioma_destino):
+    return obtener_traductor_servicio().traducir_varios(textos, idioma_destino)
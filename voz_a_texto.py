@@ -3,9 +3,12 @@ import sys
 import os
 import io
 
-# Fix encoding for Windows console
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+import calibracion_voz
+
+def configurar_consola():
+    # Fix encoding for Windows console
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
 def reconocer_voz():
     """Reconoce voz usando Google Speech Recognition"""
@@ -14,10 +17,12 @@ def reconocer_voz():
     try:
         # Configurar micrófono
         with sr.Microphone() as source:
-            recognizer.adjust_for_ambient_noise(source, duration=2)
+            # Calibración guardada; solo se mide el ruido si no hay o está vencida
+            calibracion_voz.preparar(recognizer, source, duracion=2)
             
             # Escuchar audio
             audio = recognizer.listen(source, timeout=10, phrase_time_limit=8)
+        calibracion_voz.actualizar(recognizer)
             
         # Reconocer usando Google
         texto = recognizer.recognize_google(audio, language="es-ES")
@@ -54,4 +59,5 @@ def main():
             break
 
 if __name__ == "__main__":
+    configurar_consola()
     main()
\ No newline at end of file
@@ -1,12 +1,14 @@
 import speech_recognition as sr
-from googletrans import Translator
+import calibracion_voz
+from traduccion import traducir
 import pyttsx3
 import sys
 import io
 
-# Fix encoding for Windows console
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+def configurar_consola():
+    # Fix encoding for Windows console
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
 def reconocer_voz():
     """Reconoce voz del usuario"""
@@ -15,8 +17,9 @@ def reconocer_voz():
     try:
         with sr.Microphone() as source:
             print("Escuchando... Habla ahora")
-            recognizer.adjust_for_ambient_noise(source, duration=1)
+            calibracion_voz.preparar(recognizer, source)
             audio = recognizer.listen(source, timeout=10, phrase_time_limit=8)
+        calibracion_voz.actualizar(recognizer)
             
         texto = recognizer.recognize_google(audio, language="es-ES")
         print(f"Dijiste: {texto}")
@@ -31,10 +34,8 @@ def reconocer_voz():
 
 def traducir_y_hablar(texto, idioma_destino):
     try:
-        # Traducir texto
-        traductor = Translator()
-        traduccion = traductor.translate(texto, dest=idioma_destino)
-        texto_traducido = traduccion.text
+        # Traducir texto (con caché)
+        texto_traducido = traducir(texto, idioma_destino)
         
         print(f"Traduccion ({idioma_destino}): {texto_traducido}")
 
@@ -73,7 +74,7 @@ def main():
         mic = sr.Microphone()
         print("Ajustando al ruido ambiental...")
         with mic as source:
-            recognizer.adjust_for_ambient_noise(source, duration=2)
+            calibracion_voz.preparar(recognizer, source, duracion=2)
         print("Microfono listo")
     except Exception as e:
         print(f"Error con el microfono: {e}")
@@ -98,4 +99,5 @@ def main():
             break
 
 if __name__ == "__main__":
+    configurar_consola()
     main()
\ No newline at end of file
@@ -0,0 +1,21 @@
+"""
+Punto de entrada WSGI para producción
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Con preload_app gunicorn importa este módulo una sola vez en el proceso maestro:
+el modelo estático de señas se carga aquí y los workers lo heredan por
+copy-on-write al hacer fork. Nada de lo que se hace aquí puede crear hilos ni
+conexiones (pools, MQTT, SQLite): eso arranca en cada worker (post_fork).
+"""
+
+import gc
+
+import config
+from servidor_web_python import app, precargar_modelos_senas
+
+if config.PRECARGAR_MODELOS:
+    precargar_modelos_senas()
+
+# Sacar los objetos ya cargados del recolector: si no, cada worker los recorre
+# (y escribe sus cabeceras) en la primera recolección y se pierde el copy-on-write
+gc.freeze()